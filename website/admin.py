@@ -76,13 +76,14 @@ class RoomAdmin(admin.ModelAdmin):
     list_display = ('name', 'host_name', 'created', 'total_likes')
     list_filter = ('created', 'host__username')
     search_fields = ('name', 'host__username')
+    readonly_fields = ('likes_count', 'messages_count', 'participants_count')
 
     def host_name(self, obj):
         return obj.host.username if obj.host else "None"
     host_name.short_description = 'Host'
 
     def total_likes(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
     total_likes.short_description = 'Likes'
 
 
@@ -243,7 +244,7 @@ class SelectedHoursFilter(admin.SimpleListFilter):
     def queryset(self, request, queryset):
         if self.value():
             value = int(self.value())
-            return queryset.filter(**{f'hour_{value}_{value+1}': True})
+            return queryset.covering(Availability.slot_mask(value, value + 1))
         return queryset
 
 
@@ -267,8 +268,7 @@ class AvailabilityAdmin(admin.ModelAdmin):
     search_fields = ('user__name', 'day', 'user__email', 'user__add_info')
 
     def get_selected_hours(self, obj):
-        selected_hours = [hour for hour in range(6, 23) if getattr(obj, f'hour_{hour}_{hour+1}', False)]
-        return ', '.join(map(str, selected_hours))
+        return ', '.join(map(str, obj.hour_list))
 
     get_selected_hours.short_description = 'Selected Hours'
 
@@ -281,6 +281,7 @@ class AvailabilityAdmin(admin.ModelAdmin):
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('author', 'body_preview', 'room_name', 'created')
     list_filter = ('room__name',)
+    readonly_fields = ('likes_count',)
 
     def body_preview(self, obj):
         return obj.body[:50] + '...' if len(obj.body) > 50 else obj.body
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+
+BLOG_SIDEBAR_KEY = 'blog-sidebar:v1'
+
+
+def get_blog_sidebar():
+    """
+    Categories and archive dates for the blog sidebar, cached until a post or category changes.
+
+    The signal handlers in signals.py delete the key; the timeout only bounds staleness in other
+    processes when a per-process backend such as locmem is used.
+    """
+    from .models import BlogPost, BlogCategory
+
+    sidebar = cache.get(BLOG_SIDEBAR_KEY)
+    if sidebar is None:
+        sidebar = {
+            'categories': list(BlogCategory.objects.all()),
+            'years': list(BlogPost.objects.dates('created_at', 'year')),
+            'months': list(BlogPost.objects.dates('created_at', 'month')),
+            'days': list(BlogPost.objects.dates('created_at', 'day')),
+        }
+        cache.set(BLOG_SIDEBAR_KEY, sidebar, settings.BLOG_SIDEBAR_CACHE_TIMEOUT)
+    return sidebar
+
+
+def invalidate_blog_sidebar():
+    cache.delete(BLOG_SIDEBAR_KEY)
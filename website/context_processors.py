@@ -0,0 +1,55 @@
+from functools import cache
+
+from django.urls import reverse
+
+# First matching group wins; users in none of them are sent to the application form.
+TARGET_URLS = (
+    ('NewTeachers', 'schoolweb:coursesLoader'),
+    ('NewStudents', 'schoolweb:coursesLoader'),
+    ('Teachers', 'schoolweb:teacherPage'),
+    ('Students', 'schoolweb:studentPage'),
+    ('Writers', 'schoolweb:WriterToTutoringZone'),
+)
+DEFAULT_TARGET_URL = 'schoolweb:applyUser'
+
+NAVBAR_TEMPLATES = (
+    ('Teachers', 'tutoring-zone/nav-teacher-view.html'),
+    ('Students', 'tutoring-zone/nav-student-view.html'),
+)
+DEFAULT_NAVBAR_TEMPLATE = 'tutoring-zone/nav-no-search.html'
+
+
+@cache
+def reverse_once(name):
+    # URL names used here take no arguments, so each resolves to the same path for the life of the process.
+    return reverse(name)
+
+
+def _first_match(roles, choices, default):
+    return next((value for role, value in choices if role in roles), default)
+
+
+def navigation(request):
+    """
+    `target_url` (URL name), `user_redirect_url` and `navbar_template` for the user's role.
+
+    The values are callables, which templates call on first use, so pages that do not show the
+    navigation never look at the roles. Views can still override any of them in their own context.
+    """
+    @cache
+    def target_url():
+        return _first_match(getattr(request, 'user_roles', frozenset()), TARGET_URLS, DEFAULT_TARGET_URL)
+
+    @cache
+    def user_redirect_url():
+        return reverse_once(target_url())
+
+    @cache
+    def navbar_template():
+        return _first_match(getattr(request, 'user_roles', frozenset()), NAVBAR_TEMPLATES, DEFAULT_NAVBAR_TEMPLATE)
+
+    return {
+        'target_url': target_url,
+        'user_redirect_url': user_redirect_url,
+        'navbar_template': navbar_template,
+    }
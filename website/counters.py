@@ -0,0 +1,108 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Write-behind counter for BlogPost.views.
+
+    Hits are summed in process memory and written as `views = views + n`, one UPDATE per distinct n,
+    at most every BLOG_VIEWS_FLUSH_INTERVAL seconds and when the process exits. The buffer lives in
+    the web worker itself, so flushing happens there too, not in cron: on the first request after the
+    interval, or from a background timer armed by the first buffered hit when the worker goes quiet.
+
+    BlogPost.views is therefore approximate: it lags by up to one interval of hits per worker, and a
+    worker that is killed without a clean exit loses its unflushed hits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def record(self, post_id):
+        with self._lock:
+            self._pending[post_id] += 1
+            due = time.monotonic() - self._last_flush >= settings.BLOG_VIEWS_FLUSH_INTERVAL
+            if not due and self._timer is None:
+                self._timer = threading.Timer(settings.BLOG_VIEWS_FLUSH_INTERVAL, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending[post_id]
+
+    def flush(self):
+        """Write buffered hits to the database; returns the number of hits written."""
+        from .models import BlogPost
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+            # The buffer is empty now; the next hit arms a new timer.
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for post_id, count in pending.items():
+            by_increment[count].append(post_id)
+
+        try:
+            with transaction.atomic():
+                for count, post_ids in by_increment.items():
+                    BlogPost.objects.filter(pk__in=post_ids).update(views=F('views') + count)
+        except DatabaseError:
+            logger.exception('Nie udało się zapisać wyświetleń wpisów, ponowna próba przy kolejnym zapisie.')
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+
+        return sum(pending.values())
+
+    def _flush_later(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread got its own connection; don't leave it open until the worker exits.
+            connection.close()
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
+
+
+def reconcile_room_counters():
+    """
+    Recompute denormalized Room/Message counters from the source tables in two UPDATE statements.
+
+    Fixes drift from writes that bypass signals (raw SQL, cascades on user deletion, bulk imports).
+    """
+    from .models import Room, Message, count_subquery
+
+    with transaction.atomic():
+        rooms = Room.objects.update(
+            likes_count=count_subquery(Room.likes.through.objects.all(), 'room'),
+            messages_count=count_subquery(Message.objects.all(), 'room'),
+            participants_count=count_subquery(Room.participants.through.objects.all(), 'room'),
+        )
+        messages = Message.objects.update(
+            likes_count=count_subquery(Message.likes.through.objects.all(), 'message'),
+        )
+    return rooms, messages
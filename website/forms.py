@@ -405,15 +405,21 @@ class LessonCorrectionForm(forms.ModelForm):
     )
 
 
+def availability_window():
+    """First and last day (inclusive) a user may set availability for: tomorrow up to a week after it."""
+    tomorrow = (timezone.now() + timezone.timedelta(days=1)).date()
+    return tomorrow, tomorrow + timezone.timedelta(days=7)
+
+
 class AvailabilityForm(forms.ModelForm):
     class Meta:
         model = Availability
-        fields = ['day', 'hour_6_7', 'hour_7_8', 'hour_8_9', 'hour_9_10', 'hour_10_11', 'hour_11_12',
-                  'hour_12_13', 'hour_13_14', 'hour_14_15', 'hour_15_16', 'hour_16_17', 'hour_17_18',
-                  'hour_18_19', 'hour_19_20', 'hour_20_21', 'hour_21_22']
+        fields = ['day']
 
     def __init__(self, *args, **kwargs):
         super(AvailabilityForm, self).__init__(*args, **kwargs)
-        tomorrow = timezone.now() + timezone.timedelta(days=1)
-        seven_days_later = tomorrow + timezone.timedelta(days=7)
-        self.fields['day'].widget = forms.DateInput(attrs={'type': 'date', 'min': tomorrow.date(), 'max': seven_days_later.date()})
+        # One checkbox per hour; the view packs them into Availability.hours.
+        for field in Availability.HOUR_FIELDS:
+            self.fields[field] = forms.BooleanField(required=False)
+        tomorrow, seven_days_later = availability_window()
+        self.fields['day'].widget = forms.DateInput(attrs={'type': 'date', 'min': tomorrow, 'max': seven_days_later})
@@ -0,0 +1,107 @@
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .pagination import KeysetPage, KeysetPaginator
+
+LIKERS_PER_PAGE = 20
+DEFAULT_AVATAR = '/static/img/profile-pictures/avatar.svg'
+
+
+def toggle_like(model, pk, user):
+    """
+    Like or unlike `model` row `pk` for `user`; returns `(liked, likes_count)`.
+
+    Works directly on the `likes` through table: the DELETE doubles as the existence check (unique
+    index on (object, user)), otherwise the row is inserted with ON CONFLICT DO NOTHING so double
+    clicks cannot create duplicates. Only the `likes_count` column of the parent is touched, in an
+    UPDATE ... RETURNING, so no COUNT query is needed and `updated` is not bumped.
+    Raises `model.DoesNotExist` when there is no such row.
+    """
+    field = model._meta.get_field('likes')
+    through = field.remote_field.through._meta
+    object_column = through.get_field(field.m2m_field_name()).column
+    user_column = through.get_field(field.m2m_reverse_field_name()).column
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {through.db_table} WHERE {object_column} = %s AND {user_column} = %s", [pk, user.pk]
+        )
+        if cursor.rowcount:
+            liked, delta = False, -1
+        else:
+            cursor.execute(
+                f"INSERT INTO {through.db_table} ({object_column}, {user_column}) VALUES (%s, %s) "
+                f"ON CONFLICT DO NOTHING",
+                [pk, user.pk],
+            )
+            liked, delta = True, cursor.rowcount
+
+        cursor.execute(
+            f"UPDATE {model._meta.db_table} SET likes_count = likes_count + %s WHERE id = %s RETURNING likes_count",
+            [delta, pk],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise model.DoesNotExist(f'{model.__name__} {pk} does not exist.')
+
+    return liked, row[0]
+
+
+def _likes_through(model):
+    """Return the `likes` through model and the name of its FK pointing at `model`."""
+    field = model._meta.get_field('likes')
+    return field.remote_field.through, field.m2m_field_name()
+
+
+def _likers(model):
+    """Through rows joined to their user, loading only the columns `serialize_liker` needs."""
+    through, object_field = _likes_through(model)
+    return through.objects.select_related('user').only(
+        'id', object_field, 'user__id', 'user__username', 'user__avatar'
+    )
+
+
+def likers_paginator(model, pk, per_page=LIKERS_PER_PAGE):
+    _, object_field = _likes_through(model)
+    return KeysetPaginator(_likers(model).filter(**{object_field: pk}), per_page, ordering=('-id',))
+
+
+def liker_summaries(model, pks, per_page=LIKERS_PER_PAGE):
+    """
+    First page of likers for every `model` row in `pks`, in one query.
+
+    Returns `{pk: KeysetPage}`. A correlated `id IN (SELECT ... LIMIT per_page + 1)` caps the rows read
+    per object, so one viral comment cannot blow up the batch.
+    """
+    through, object_field = _likes_through(model)
+    newest = through.objects.filter(**{object_field: OuterRef(object_field)}).order_by('-id').values('id')
+    rows = _likers(model).filter(
+        **{f'{object_field}__in': pks}, id__in=Subquery(newest[:per_page + 1])
+    ).order_by(object_field, '-id')
+
+    grouped = {pk: [] for pk in pks}
+    for row in rows:
+        grouped[getattr(row, f'{object_field}_id')].append(row)
+
+    paginator = KeysetPaginator(_likers(model), per_page, ordering=('-id',))
+    pages = {}
+    for pk, object_list in grouped.items():
+        next_cursor = None
+        if len(object_list) > per_page:
+            object_list = object_list[:per_page]
+            next_cursor = paginator.encode_cursor(object_list[-1])
+        pages[pk] = KeysetPage(object_list, next_cursor)
+    return pages
+
+
+def serialize_liker(row):
+    user = row.user
+    return {
+        'id': user.id,
+        'username': user.username,
+        'avatar': user.avatar.url if user.avatar else DEFAULT_AVATAR,
+    }
+
+
+def serialize_likers_page(page):
+    return {'liked_users': [serialize_liker(row) for row in page], 'next_cursor': page.next_cursor}
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from website.models import Availability, User
+
+LEGACY_TABLE = 'benchmark_availability_columns'
+
+
+class Command(BaseCommand):
+    help = (
+        'Porównuje wyszukiwanie wolnych korepetytorów: maska bitowa Availability.hours kontra dawne 16 kolumn '
+        'hour_X_Y (tymczasowa tabela z tymi samymi danymi). Wszystkie zmiany w bazie są wycofywane.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--days', type=int, default=60)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        first_day = date(2026, 1, 1)
+        days = [first_day + timedelta(days=i) for i in range(options['days'])]
+        queries = []
+        for _ in range(options['queries']):
+            start = rng.randrange(Availability.FIRST_HOUR, Availability.LAST_HOUR - 1)
+            queries.append((rng.choice(days), start, start + rng.randint(1, 3)))
+
+        with transaction.atomic():
+            self._fill(rng, days, options['users'])
+
+            for label, mode in (('pełne pokrycie przedziału', 'covering'), ('dowolna godzina w przedziale', 'overlapping')):
+                legacy, matches_legacy = self._time(lambda q: self._legacy_query(mode, *q), queries)
+                mask, matches_mask = self._time(lambda q: self._mask_query(mode, *q), queries)
+                self.stdout.write(
+                    f'{label}: kolumny {legacy * 1000:.2f} ms/zapytanie, maska {mask * 1000:.2f} ms/zapytanie, '
+                    f'wyniki zgodne: {matches_legacy == matches_mask}'
+                )
+
+            transaction.set_rollback(True)
+
+    def _fill(self, rng, days, user_count):
+        User.objects.bulk_create([
+            User(username=f'benchmark-dostepnosc-{i}', email=f'benchmark-dostepnosc-{i}@example.com')
+            for i in range(user_count)
+        ])
+        users = list(User.objects.filter(username__startswith='benchmark-dostepnosc-'))
+        rows = [
+            Availability(user=user, day=day, hours=rng.getrandbits(len(Availability.HOUR_FIELDS)))
+            for user in users for day in days if rng.random() < 0.5
+        ]
+        Availability.objects.bulk_create(rows, batch_size=2000)
+
+        columns = ', '.join(f'{field} boolean NOT NULL' for field in Availability.HOUR_FIELDS)
+        placeholders = ', '.join(['%s'] * (len(Availability.HOUR_FIELDS) + 2))
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMPORARY TABLE {LEGACY_TABLE} (user_id bigint NOT NULL, day date NOT NULL, {columns})')
+            cursor.execute(f'CREATE INDEX {LEGACY_TABLE}_day ON {LEGACY_TABLE} (day)')
+            cursor.executemany(
+                f'INSERT INTO {LEGACY_TABLE} VALUES ({placeholders})',
+                [
+                    (row.user_id, row.day, *Availability.flags_from_mask(row.hours).values())
+                    for row in rows
+                ],
+            )
+
+    def _time(self, run, queries):
+        started = time.perf_counter()
+        results = [run(query) for query in queries]
+        return (time.perf_counter() - started) / len(queries), results
+
+    def _legacy_query(self, mode, day, start, end):
+        fields = Availability.HOUR_FIELDS[start - Availability.FIRST_HOUR:end - Availability.FIRST_HOUR]
+        joiner = ' AND ' if mode == 'covering' else ' OR '
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT user_id FROM {LEGACY_TABLE} WHERE day = %s AND ({joiner.join(fields)})', [day]
+            )
+            return sorted(user_id for user_id, in cursor.fetchall())
+
+    def _mask_query(self, mode, day, start, end):
+        # Run the SQL the queryset API generates through the same raw cursor as the legacy query.
+        rows = getattr(Availability.objects.filter(day=day), mode)(Availability.slot_mask(start, end))
+        sql, params = rows.values_list('user_id').order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return sorted(user_id for user_id, in cursor.fetchall())
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, connections
+from django.db.models import F
+from django.test import override_settings
+
+from website.models import BlogCategory, BlogPost, PlatformMessage, User
+
+BENCHMARK_EMAIL = 'benchmark-bazy@example.com'
+# SQLite defaults: rollback journal, fsync on every commit, Python's 5 s lock timeout.
+STOCK_SQLITE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Test obciążeniowy zapisów do bazy "default": równoległe wątki piszące (polubienia, wyświetlenia, '
+        'wiadomości kontaktowe) i czytające. Uruchom na SQLite i na PostgreSQL, aby porównać przepustowość. '
+        'Na SQLite porównuje domyślne ustawienia z SQLITE_PRAGMAS (WAL). Dane testowe są usuwane po zakończeniu.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+
+    def handle(self, *args, **options):
+        author = User.objects.create_user(username='benchmark-bazy', email=BENCHMARK_EMAIL)
+        category = BlogCategory.objects.create(name='benchmark-bazy')
+        post = BlogPost.objects.create(title='Benchmark', slug='benchmark-bazy', author=author, category=category)
+        connection.close()
+
+        if connection.vendor == 'sqlite':
+            profiles = [('SQLite domyślne', STOCK_SQLITE_PRAGMAS), ('SQLite SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS)]
+        else:
+            profiles = [(connection.vendor, settings.SQLITE_PRAGMAS)]
+        try:
+            for label, pragmas in profiles:
+                # journal_mode is stored in the database file, so every run starts from fresh connections.
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    elapsed, counts = self._run(post, category, options)
+                connections.close_all()
+                self.stdout.write(f'{label}, czas: {elapsed:.1f} s')
+                for kind, kind_label in (('write', 'zapisy'), ('read', 'odczyty')):
+                    done, failed = counts[kind]
+                    self.stdout.write(f'  {kind_label}: {done / elapsed:.1f} op/s, błędy: {failed}')
+        finally:
+            PlatformMessage.objects.filter(email=BENCHMARK_EMAIL).delete()
+            post.delete()
+            category.delete()
+            author.delete()
+
+    def _run(self, post, category, options):
+        deadline = time.monotonic() + options['seconds']
+        counts = {'write': [0, 0], 'read': [0, 0]}
+        lock = threading.Lock()
+
+        def write_once(i):
+            operation = i % 3
+            if operation == 0:
+                BlogPost.change_likes(post.pk, 1)
+            elif operation == 1:
+                BlogPost.objects.filter(pk=post.pk).update(views=F('views') + 1)
+            else:
+                PlatformMessage.objects.create(email=BENCHMARK_EMAIL, phone_number='123456789', message='benchmark')
+
+        def read_once(i):
+            list(BlogPost.objects.filter(category=category).values('id', 'likes', 'views'))
+            PlatformMessage.objects.filter(email=BENCHMARK_EMAIL).count()
+
+        def worker(kind, operation):
+            done = failed = i = 0
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        operation(i)
+                        done += 1
+                    except DatabaseError:
+                        # e.g. "database is locked" on SQLite once busy_timeout runs out
+                        failed += 1
+                    i += 1
+            finally:
+                connections.close_all()
+            with lock:
+                counts[kind][0] += done
+                counts[kind][1] += failed
+
+        threads = [threading.Thread(target=worker, args=('write', write_once)) for _ in range(options['writers'])]
+        threads += [threading.Thread(target=worker, args=('read', read_once)) for _ in range(options['readers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - started, counts
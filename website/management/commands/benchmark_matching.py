@@ -0,0 +1,43 @@
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from website.matching import HOURS_PER_DAY, MatchingEngine
+
+LEVELS = ('Podstawa', 'Rozszerzenie', '')
+
+
+class Command(BaseCommand):
+    help = 'Mierzy czas dopasowania oczekujących uczniów do korepetytorów na losowych danych (bez bazy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--teachers', type=int, default=300)
+        parser.add_argument('--subjects', type=int, default=12)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        week_bits = 7 * HOURS_PER_DAY
+        teachers = [
+            (teacher_id, rng.randrange(options['subjects']), rng.choice(LEVELS))
+            for teacher_id in range(1, options['teachers'] + 1)
+        ]
+        students = [
+            SimpleNamespace(id=i, user_id=-i, subject_id=rng.choice([None, *range(options['subjects'])]),
+                            level=rng.choice(LEVELS[:2]))
+            for i in range(1, options['students'] + 1)
+        ]
+        slots = {teacher_id: rng.getrandbits(week_bits) for teacher_id, _, _ in teachers}
+        slots.update({student.user_id: rng.getrandbits(week_bits) for student in students})
+
+        started = time.perf_counter()
+        engine = MatchingEngine(teachers, slots)
+        rankings = engine.rank_all(students, slots)
+        elapsed = time.perf_counter() - started
+
+        scored = sum(len(ranking) for ranking in rankings.values())
+        self.stdout.write(
+            f'{len(students)} uczniów x {len(teachers)} korepetytorów: {elapsed * 1000:.0f} ms, ocenionych par: {scored}'
+        )
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from website.models import User
+
+STOCK_MIDDLEWARE = 'django.contrib.sessions.middleware.SessionMiddleware'
+SLIDING_MIDDLEWARE = 'website.sessions.SlidingSessionMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        'Porównuje przepustowość i liczbę zapisów do django_session: zapis sesji przy każdym żądaniu '
+        '(SESSION_SAVE_EVERY_REQUEST) kontra SlidingSessionMiddleware. Wszystkie zmiany w bazie są wycofywane.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--path', default=None, help='Domyślnie Strefa Wiedzy, która czyta sesję (request.user).')
+
+    def handle(self, *args, **options):
+        path = options['path'] or reverse('schoolweb:knowledge_zone')
+        middleware = list(settings.MIDDLEWARE)
+
+        runs = [
+            ('zapis przy każdym żądaniu', True, [
+                STOCK_MIDDLEWARE if name == SLIDING_MIDDLEWARE else name for name in middleware
+            ]),
+            ('SlidingSessionMiddleware', False, [
+                SLIDING_MIDDLEWARE if name == STOCK_MIDDLEWARE else name for name in middleware
+            ]),
+        ]
+        for label, save_every_request, run_middleware in runs:
+            with override_settings(MIDDLEWARE=run_middleware, SESSION_SAVE_EVERY_REQUEST=save_every_request):
+                rate, writes = self._run(path, options['requests'])
+            self.stdout.write(f'{label}: {rate:.1f} req/s, zapisy sesji: {writes}')
+
+    def _run(self, path, count):
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark-sesji', email='benchmark-sesji@example.com')
+            client = Client()
+            client.force_login(user)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(count):
+                    client.get(path)
+                elapsed = time.perf_counter() - started
+
+            writes = sum(
+                query['sql'].startswith(('UPDATE', 'INSERT')) and 'django_session' in query['sql'] for query in queries
+            )
+            transaction.set_rollback(True)
+        return count / elapsed, writes
@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+import environ
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+SOURCE_ALIAS = 'copy_source'
+# Filled by post_migrate in every fresh database; replaced with the source rows so their ids stay consistent.
+REGENERATED_TABLES = ('django_content_type', 'auth_permission')
+
+
+@contextmanager
+def raw_timestamps(model):
+    """Keep copied created/updated values: bulk_create would otherwise overwrite auto_now(_add) fields."""
+    fields = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Kopiuje wszystkie dane z innej bazy (np. db.sqlite3) do bazy "default" partiami przez bulk_create. '
+        'Baza docelowa musi być zmigrowana i pusta.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source_url', help='np. sqlite:////srv/schoolweb/db.sqlite3')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        connections.settings[SOURCE_ALIAS] = {
+            **connections.settings['default'], 'OPTIONS': {}, **environ.Env.db_url_config(options['source_url'])
+        }
+        source, target = connections[SOURCE_ALIAS], connections['default']
+
+        models = [
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+        ]
+        tables = set(target.introspection.table_names())
+        models = [model for model in models if model._meta.db_table in tables]
+
+        for model in models:
+            if model._meta.db_table not in REGENERATED_TABLES and model._base_manager.using('default').exists():
+                raise CommandError(f'Tabela {model._meta.db_table} w bazie docelowej nie jest pusta.')
+
+        # One transaction: PostgreSQL checks the (deferred) foreign keys at commit, so table order does not matter.
+        with transaction.atomic(using='default'):
+            for model in models:
+                if model._meta.db_table in REGENERATED_TABLES:
+                    model._base_manager.using('default').all()._raw_delete('default')
+            for model in models:
+                copied = self.copy_model(model, options['batch_size'])
+                self.stdout.write(f'{model._meta.db_table}: {copied}')
+
+            with target.cursor() as cursor:
+                for sql in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        source.close()
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+
+    def copy_model(self, model, batch_size):
+        """Copy rows in primary key order, reading each batch with WHERE pk > last instead of OFFSET."""
+        rows = model._base_manager.using(SOURCE_ALIAS).order_by('pk')
+        copied, last_pk = 0, None
+        while True:
+            batch = list((rows if last_pk is None else rows.filter(pk__gt=last_pk))[:batch_size])
+            if not batch:
+                return copied
+            with raw_timestamps(model):
+                model._base_manager.using('default').bulk_create(batch, batch_size=batch_size)
+            copied += len(batch)
+            last_pk = batch[-1].pk
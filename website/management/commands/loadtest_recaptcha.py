@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = {
+    'wiadomosc': ('/kontakt/', '/wiadomosc/', {
+        'email': 'test@example.com', 'message': 'Test obciążeniowy', 'g-recaptcha-response': 'token',
+    }),
+    'logowanie': ('/logowanie-strefa-wiedzy/', '/logowanie-strefa-wiedzy/', {
+        'email': 'nieistnieje@example.com', 'password': 'zle-haslo', 'g-recaptcha-response': 'token',
+    }),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mierzy przepustowość endpointów z reCAPTCHA (wiadomość kontaktowa, logowanie) na działającym serwerze. '
+        'Serwer musi mieć RECAPTCHA_VERIFY_URL ustawione na `manage.py recaptcha_stub --delay ...`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='np. http://127.0.0.1:8000')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='wiadomosc')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        form_path, post_path, data = ENDPOINTS[options['endpoint']]
+        base_url = options['base_url'].rstrip('/')
+
+        def worker(count):
+            session = requests.Session()
+            session.get(base_url + form_path, timeout=10)
+            token = session.cookies.get('csrftoken', '')
+            latencies, errors = [], 0
+            for _ in range(count):
+                started = time.monotonic()
+                try:
+                    response = session.post(
+                        base_url + post_path, data=data, timeout=30,
+                        headers={'X-CSRFToken': token, 'Referer': base_url + form_path},
+                    )
+                    errors += response.status_code >= 500
+                except requests.RequestException:
+                    errors += 1
+                latencies.append(time.monotonic() - started)
+            return latencies, errors
+
+        concurrency = options['concurrency']
+        per_worker = [options['requests'] // concurrency + (i < options['requests'] % concurrency) for i in range(concurrency)]
+
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(worker, per_worker))
+        except requests.RequestException as e:
+            raise CommandError(f'Serwer {base_url} nie odpowiada: {e}')
+        elapsed = time.monotonic() - started
+        if not any(per_worker):
+            raise CommandError('Brak żądań do wykonania.')
+
+        latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+        errors = sum(worker_errors for _, worker_errors in results)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+
+        self.stdout.write(
+            f'{len(latencies)} żądań w {elapsed:.2f} s: {len(latencies) / elapsed:.1f} req/s, '
+            f'p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, błędy: {errors}'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from website.search import rebuild_room_index, rebuild_blog_index
+
+
+class Command(BaseCommand):
+    help = 'Przebudowuje indeksy pełnotekstowe Strefy Wiedzy (posty i komentarze) oraz bloga.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rooms = rebuild_room_index(batch_size=options['batch_size'])
+            blog_posts = rebuild_blog_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Zaindeksowano posty: {rooms}, wpisy na blogu: {blog_posts}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from website.recaptcha_stub import RecaptchaStub
+
+
+class Command(BaseCommand):
+    help = 'Uruchamia lokalny, fałszywy weryfikator reCAPTCHA (do testów i testów obciążeniowych bez sieci).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--delay', type=float, default=0, help='Opóźnienie każdej odpowiedzi w sekundach.')
+
+    def handle(self, *args, **options):
+        stub = RecaptchaStub(port=options['port'], delay=options['delay'])
+        self.stdout.write(self.style.SUCCESS(f'RECAPTCHA_VERIFY_URL={stub.url}'))
+        try:
+            stub.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.server.server_close()
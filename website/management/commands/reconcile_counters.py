@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from website.counters import reconcile_room_counters
+
+
+class Command(BaseCommand):
+    help = 'Przelicza liczniki polubień, komentarzy i uczestników postów oraz komentarzy Strefy Wiedzy.'
+
+    def handle(self, *args, **options):
+        rooms, messages = reconcile_room_counters()
+        self.stdout.write(self.style.SUCCESS(f'Przeliczono posty: {rooms}, komentarze: {messages}'))
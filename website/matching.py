@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db.models import Q
+
+from .models import Availability, User
+
+SUBJECT_POINTS = 40
+LEVEL_POINTS = 30
+AVAILABILITY_POINTS = 30
+# Shared weekly hours at which the availability part of the score is full.
+FULL_OVERLAP_HOURS = 4
+# Availability is kept per date; this many days from today are folded into one weekly pattern.
+SLOT_WINDOW_DAYS = 28
+SUGGESTIONS_LIMIT = 10
+
+HOURS_PER_DAY = len(Availability.HOUR_FIELDS)
+# Levels a teacher can take on; a teacher without a level gets no level points.
+TEACHABLE_LEVELS = {
+    'Podstawa': {'Podstawa'},
+    'Rozszerzenie': {'Podstawa', 'Rozszerzenie'},
+}
+
+
+def weekly_mask(masks_by_day):
+    """Fold `{day: hours mask}` into one int: bit `weekday * HOURS_PER_DAY + hour bit`."""
+    weekly = 0
+    for day, mask in masks_by_day.items():
+        weekly |= mask << (day.weekday() * HOURS_PER_DAY)
+    return weekly
+
+
+def weekly_slots(users, start=None):
+    """`{user_id: weekly mask}` for `users` (ids or a queryset) over SLOT_WINDOW_DAYS from `start`, in one query."""
+    start = start or date.today()
+    availability = Availability.objects.filter(
+        user__in=users, day__gte=start, day__lt=start + timedelta(days=SLOT_WINDOW_DAYS)
+    )
+    return {user_id: weekly_mask(days) for user_id, days in availability.masks_by_user().items()}
+
+
+class MatchingEngine:
+    """
+    Scores pending students against every teacher by subject, level and shared weekly hours.
+
+    Teachers are bucketed by subject once, so each student is only compared with the teachers of its
+    subject (or with all of them when the student did not pick one); a teacher of another subject is
+    never suggested.
+    """
+
+    def __init__(self, teachers, slots):
+        """`teachers` are `(id, subject_id, level)` tuples, `slots` is `{user_id: weekly mask}`."""
+        self._everyone = []
+        self._by_subject = defaultdict(list)
+        for teacher_id, subject_id, level in teachers:
+            entry = (teacher_id, TEACHABLE_LEVELS.get(level, ()), slots.get(teacher_id, 0))
+            self._everyone.append(entry)
+            self._by_subject[subject_id].append(entry)
+
+    def rank(self, subject_id, level, student_mask):
+        """`[(score, teacher_id), ...]` best first for one student."""
+        if subject_id is None:
+            candidates, base = self._everyone, 0
+        else:
+            candidates, base = self._by_subject.get(subject_id, ()), SUBJECT_POINTS
+
+        ranking = []
+        for teacher_id, levels, teacher_mask in candidates:
+            shared = (teacher_mask & student_mask).bit_count()
+            score = (
+                base
+                + (LEVEL_POINTS if level in levels else 0)
+                + AVAILABILITY_POINTS * min(shared, FULL_OVERLAP_HOURS) // FULL_OVERLAP_HOURS
+            )
+            ranking.append((score, teacher_id))
+        ranking.sort(key=lambda match: (-match[0], match[1]))
+        return ranking
+
+    def rank_all(self, students, slots):
+        """`{student.id: ranking}` for NewStudents rows (only `subject_id`, `level` and `user_id` are read)."""
+        return {
+            student.id: self.rank(student.subject_id, student.level, slots.get(student.user_id, 0))
+            for student in students
+        }
+
+
+def suggestions_for_teacher(teacher, students, limit=SUGGESTIONS_LIMIT, start=None):
+    """
+    The `limit` students from the `students` queryset that suit `teacher` best, each with `match_score`
+    (0-100) and `match_position` (1 = no other teacher matches this student better). Three queries:
+    teachers, everyone's availability, students.
+    """
+    teachers = User.objects.filter(groups__name='Teachers')
+    slots = weekly_slots(
+        User.objects.filter(Q(id__in=teachers.values('id')) | Q(id__in=students.values('user'))).values('id'), start
+    )
+    engine = MatchingEngine(teachers.values_list('id', 'subject_id', 'level'), slots)
+    rankings = engine.rank_all(students, slots)
+
+    suggestions = []
+    for student in students:
+        ranking = rankings[student.id]
+        score = next((score for score, teacher_id in ranking if teacher_id == teacher.id), None)
+        if score is None:
+            continue
+        student.match_score = score
+        student.match_position = 1 + sum(other > score for other, _ in ranking)
+        suggestions.append(student)
+
+    suggestions.sort(key=lambda student: (-student.match_score, student.match_position, student.id))
+    return suggestions[:limit]
@@ -0,0 +1,16 @@
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+
+class UserRolesMiddleware(MiddlewareMixin):
+    """
+    Sets `request.user_roles`, the frozenset of the user's group names (empty for anonymous users).
+
+    It is lazy and backed by `User.roles`, so a request costs at most one groups query however many
+    role checks the view, templates and `user_passes_test` helpers make.
+    """
+
+    def process_request(self, request):
+        request.user_roles = SimpleLazyObject(
+            lambda: request.user.roles if request.user.is_authenticated else frozenset()
+        )
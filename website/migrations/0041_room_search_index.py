@@ -0,0 +1,83 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Frozen copy of website.search.normalize as of this migration.
+POLISH_FOLD = str.maketrans({'ł': 'l', 'Ł': 'l'})
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+BATCH_SIZE = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').translate(POLISH_FOLD))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS website_room_search "
+            "USING fts5(name, topic, description, messages, tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert = "INSERT INTO website_room_search (rowid, name, topic, description, messages) VALUES (%s, %s, %s, %s, %s)"
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS website_room_search ("
+            "source_id bigint PRIMARY KEY REFERENCES website_room (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS website_room_search_document ON website_room_search USING GIN (document)"
+        )
+        insert = (
+            "INSERT INTO website_room_search (source_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C') || setweight(to_tsvector('simple', %s), 'D'))"
+        )
+    else:
+        return
+
+    alias = schema_editor.connection.alias
+    Room = apps.get_model('website', 'Room')
+    Message = apps.get_model('website', 'Message')
+    rooms = Room.objects.using(alias).select_related('topic').order_by('id')
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = list(rooms.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            bodies = {}
+            messages = Message.objects.using(alias).filter(room__in=batch).order_by('room_id', 'id')
+            for room_id, body in messages.values_list('room_id', 'body'):
+                bodies.setdefault(room_id, []).append(body or '')
+            cursor.executemany(insert, [
+                (
+                    room.id,
+                    normalize(room.name),
+                    normalize(room.topic.name if room.topic else ''),
+                    normalize(room.description),
+                    normalize('\n'.join(bodies.get(room.id, []))),
+                )
+                for room in batch
+            ])
+            last_id = batch[-1].id
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS website_room_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0040_delete_criminalrecord'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
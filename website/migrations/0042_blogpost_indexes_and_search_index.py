@@ -0,0 +1,86 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:38
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copy of website.search.normalize as of this migration.
+POLISH_FOLD = str.maketrans({'ł': 'l', 'Ł': 'l'})
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+BATCH_SIZE = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').translate(POLISH_FOLD))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS website_blogpost_search "
+            "USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        insert = "INSERT INTO website_blogpost_search (rowid, title, content) VALUES (%s, %s, %s)"
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS website_blogpost_search ("
+            "source_id bigint PRIMARY KEY REFERENCES website_blogpost (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS website_blogpost_search_document ON website_blogpost_search USING GIN (document)"
+        )
+        insert = (
+            "INSERT INTO website_blogpost_search (source_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))"
+        )
+    else:
+        return
+
+    alias = schema_editor.connection.alias
+    BlogPost = apps.get_model('website', 'BlogPost')
+    ContentBlock = apps.get_model('website', 'ContentBlock')
+    posts = BlogPost.objects.using(alias).order_by('id')
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            texts = {}
+            blocks = ContentBlock.objects.using(alias).filter(blog_post__in=batch, text__isnull=False)
+            for post_id, text in blocks.order_by('blog_post_id', 'order').values_list('blog_post_id', 'text'):
+                texts.setdefault(post_id, []).append(text or '')
+            cursor.executemany(insert, [
+                (post.id, normalize(post.title), normalize('\n'.join(texts.get(post.id, []))))
+                for post in batch
+            ])
+            last_id = batch[-1].id
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS website_blogpost_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0041_room_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['category', 'created_at'], name='blogpost_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['created_at'], name='blogpost_created_idx'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
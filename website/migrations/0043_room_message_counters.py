@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    # Frozen copy of website.models.count_subquery as of this migration.
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counted), 0)
+
+
+def fill_counters(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Room = apps.get_model('website', 'Room')
+    Message = apps.get_model('website', 'Message')
+    Room.objects.using(alias).update(
+        likes_count=count_subquery(Room.likes.through.objects.using(alias), 'room'),
+        messages_count=count_subquery(Message.objects.using(alias), 'room'),
+        participants_count=count_subquery(Room.participants.through.objects.using(alias), 'room'),
+    )
+    Message.objects.using(alias).update(
+        likes_count=count_subquery(Message.likes.through.objects.using(alias), 'message'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0042_blogpost_indexes_and_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='messages_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='participants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0043_room_message_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['created', 'id'], name='room_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['level', 'created', 'id'], name='room_level_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['topic', 'level'], name='room_topic_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['created'], name='message_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'created', 'id'], name='message_room_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newstudents',
+            index=models.Index(fields=['is_selected'], name='newstudents_selected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newstudents',
+            index=models.Index(fields=['email'], name='newstudents_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teachersearning',
+            index=models.Index(fields=['user', 'year', 'month'], name='earning_user_year_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['event_datetime'], name='lesson_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['host', 'event_datetime'], name='lesson_host_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'event_datetime'], name='lesson_course_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursemessage',
+            index=models.Index(fields=['room', 'messageCreated', 'id'], name='coursemessage_room_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['user', 'day'], name='availability_user_day_idx'),
+        ),
+    ]
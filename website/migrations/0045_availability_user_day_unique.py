@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    # Double submits left several rows per day. The views read `.first()`, i.e. the lowest id, so that row is the one
+    # users saw and edited; the later ones are untouched copies.
+    Availability = apps.get_model('website', 'Availability')
+    duplicates = (
+        Availability.objects.values('user', 'day')
+        .annotate(rows=Count('id'), kept=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        Availability.objects.filter(user=duplicate['user'], day=duplicate['day']).exclude(id=duplicate['kept']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0044_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='availability',
+            name='availability_user_day_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='availability',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='availability_user_day_unique'),
+        ),
+    ]
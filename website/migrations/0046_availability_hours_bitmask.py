@@ -0,0 +1,103 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:10
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+HOUR_FIELDS = tuple(f'hour_{hour}_{hour + 1}' for hour in range(6, 22))
+
+
+def columns_to_mask(apps, schema_editor):
+    Availability = apps.get_model('website', 'Availability')
+    Availability.objects.update(hours=sum(
+        Case(When(**{field: True}, then=Value(1 << bit)), default=Value(0))
+        for bit, field in enumerate(HOUR_FIELDS)
+    ))
+
+
+def mask_to_columns(apps, schema_editor):
+    Availability = apps.get_model('website', 'Availability')
+    rows = list(Availability.objects.only('id', 'hours'))
+    for row in rows:
+        for bit, field in enumerate(HOUR_FIELDS):
+            setattr(row, field, bool(row.hours >> bit & 1))
+    Availability.objects.bulk_update(rows, HOUR_FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0045_availability_user_day_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availability',
+            name='hours',
+            field=models.PositiveIntegerField(default=0, verbose_name='Godziny (bit 0 = 6:00-7:00)'),
+        ),
+        migrations.RunPython(columns_to_mask, mask_to_columns),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_6_7',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_7_8',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_8_9',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_9_10',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_10_11',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_11_12',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_12_13',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_13_14',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_14_15',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_15_16',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_16_17',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_17_18',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_18_19',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_19_20',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_20_21',
+        ),
+        migrations.RemoveField(
+            model_name='availability',
+            name='hour_21_22',
+        ),
+    ]
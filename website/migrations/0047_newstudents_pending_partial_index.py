@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0046_availability_hours_bitmask'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='newstudents',
+            name='newstudents_selected_idx',
+        ),
+        migrations.AddIndex(
+            model_name='newstudents',
+            index=models.Index(condition=models.Q(('is_selected', False)), fields=['id'], name='newstudents_pending_idx'),
+        ),
+    ]
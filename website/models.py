@@ -1,7 +1,10 @@
-from django.db import models, transaction
-from django.db.models import F
+from django.db import models, transaction, connection
+from django.db.models import (F, Q, Count, OuterRef, Subquery, Prefetch, Exists, Value, BooleanField, Case, When,
+                              ExpressionWrapper)
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser, Group
 from django.core.validators import RegexValidator
+from django.utils.functional import cached_property
 import random
 import string
 from django.db.models.signals import post_save
@@ -11,6 +14,8 @@ from django.core.files.base import ContentFile
 from PIL import Image
 import os
 from io import BytesIO
+from .counters import view_counter
+from .likes import toggle_like
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~WIDGET~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -94,12 +99,62 @@ class User(AbstractUser):
 
         super().save(*args, **kwargs)
 
+    @cached_property
+    def roles(self):
+        """Names of the user's groups, loaded with one query and kept for the life of this instance."""
+        return frozenset(self.groups.values_list('name', flat=True))
 
     def __str__(self):
         return f'{self.first_name} {self.last_name}' if self.first_name and self.last_name else self.username
 
 
-class Room(models.Model):
+def count_subquery(queryset, field):
+    """Correlated COUNT(*) over `queryset` grouped by `field`, usable in annotate()."""
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counted), 0)
+
+
+def liked_by_subquery(model, user):
+    """EXISTS over `model.likes` for `user`, usable in annotate(); always False for anonymous users."""
+    if not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    through = model.likes.through
+    field = model._meta.get_field('likes')
+    return Exists(through.objects.filter(**{field.m2m_field_name(): OuterRef('pk'), field.m2m_reverse_field_name(): user.pk}))
+
+
+class CounterFieldsMixin:
+    """
+    Denormalized counters are changed only with F() updates from signals.py, so a full save() of an
+    existing row must not write back the (possibly stale) values loaded into the instance.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class RoomQuerySet(models.QuerySet):
+    FEED_PARTICIPANTS = 3
+
+    def feed(self):
+        """Rooms ready for feed-knowledge-zone.html: authors joined, first avatars prefetched."""
+        participants = User.objects.only('id', 'username', 'avatar').order_by('id')[:self.FEED_PARTICIPANTS]
+
+        return self.select_related('host', 'topic').prefetch_related(
+            Prefetch('participants', queryset=participants, to_attr='feed_participants')
+        )
+
+    def with_liked_by(self, user):
+        return self.annotate(liked_by_user=liked_by_subquery(self.model, user))
+
+
+class Room(CounterFieldsMixin, models.Model):
     LEVEL_CHOICES = [
         ('basic', 'Podstawa'),
         ('advanced', 'Rozszerzenie'),
@@ -115,11 +170,22 @@ class Room(models.Model):
     image = models.ImageField(upload_to='room-images/', null=True, blank=True)
     likes = models.ManyToManyField(User, related_name='liked_rooms', blank=True)
     level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='basic')  # Dodane pole
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    messages_count = models.PositiveIntegerField(default=0, editable=False)
+    participants_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RoomQuerySet.as_manager()
+    counter_fields = ('likes_count', 'messages_count', 'participants_count')
 
     class Meta:
         ordering = ['-created', '-updated']
         verbose_name = 'STREFA WIEDZY - Posty'
         verbose_name_plural = 'STREFA WIEDZY - Posty'
+        indexes = [
+            models.Index(fields=['created', 'id'], name='room_created_idx'),
+            models.Index(fields=['level', 'created', 'id'], name='room_level_created_idx'),
+            models.Index(fields=['topic', 'level'], name='room_topic_level_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -145,12 +211,12 @@ class Room(models.Model):
             self.host.save(update_fields=['points'])
 
             lesson_stats, _ = LessonStats.objects.get_or_create(user=self.host)
-            if self.host.groups.filter(name='Students').exists():
+            if 'Students' in self.host.roles:
                 if self.host.level == 'Podstawa':
                     lesson_stats.lessons += 1
                 elif self.host.level == 'Rozszerzenie':
                     lesson_stats.lessons_intermediate += 1
-            elif self.host.groups.filter(name='Teachers').exists():
+            elif 'Teachers' in self.host.roles:
                 lesson_stats.month_bonus += 50
                 lesson_stats.all_bonus += 50
 
@@ -165,7 +231,13 @@ class Room(models.Model):
                 host.save()
 
 
-class Message(models.Model):
+class MessageQuerySet(models.QuerySet):
+    def thread(self, user):
+        """Comments ready for room.html: authors joined, `liked_by_user` annotated for `user`."""
+        return self.select_related('user').annotate(liked_by_user=liked_by_subquery(self.model, user))
+
+
+class Message(CounterFieldsMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='messages')
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     body = models.TextField()
@@ -174,11 +246,19 @@ class Message(models.Model):
     image = models.ImageField(upload_to='message-images/', blank=True, null=True)
     likes = models.ManyToManyField(User, related_name='liked_messages', blank=True)
     file = models.FileField(upload_to='message-files/', blank=True, null=True)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = MessageQuerySet.as_manager()
+    counter_fields = ('likes_count',)
 
     class Meta:
         ordering = ['-updated', '-created']
         verbose_name = 'STREFA WIEDZY - Komentarze'
         verbose_name_plural = 'STREFA WIEDZY - Komentarze'
+        indexes = [
+            models.Index(fields=['created'], name='message_created_idx'),
+            models.Index(fields=['room', 'created', 'id'], name='message_room_created_idx'),
+        ]
 
     def __str__(self):
         return self.body[:50]
@@ -202,12 +282,12 @@ class Message(models.Model):
             self.user.save(update_fields=['points'])
 
             lesson_stats, _ = LessonStats.objects.get_or_create(user=self.user)
-            if self.user.groups.filter(name='Students').exists():
+            if 'Students' in self.user.roles:
                 if self.user.level == 'Podstawa':
                     lesson_stats.lessons += 1
                 elif self.user.level == 'Rozszerzenie':
                     lesson_stats.lessons_intermediate += 1
-            elif self.user.groups.filter(name='Teachers').exists():
+            elif 'Teachers' in self.user.roles:
                 lesson_stats.month_bonus += 50
                 lesson_stats.all_bonus += 50
 
@@ -221,11 +301,8 @@ class Message(models.Model):
             user.save(update_fields=['points'])
 
     def toggle_like(self, user):
-        if user in self.likes.all():
-            self.likes.remove(user)
-        else:
-            self.likes.add(user)
-        self.save()
+        liked, self.likes_count = toggle_like(Message, self.pk, user)
+        return liked
 
 
 class Report(models.Model):
@@ -275,9 +352,22 @@ class NewStudents(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.subject})"
 
+    @classmethod
+    def claim(cls, pk):
+        """
+        Mark the student as taken with one conditional UPDATE ... WHERE is_selected = false. Concurrent
+        callers are serialized by the row lock, so exactly one of them gets True.
+        """
+        return cls.objects.filter(pk=pk, is_selected=False).update(is_selected=True) == 1
+
     class Meta:
         verbose_name = 'STREFA KOREPETYCJI - Nowi uczniowie'
         verbose_name_plural = 'STREFA KOREPETYCJI - Nowi uczniowie'
+        indexes = [
+            # Partial: filter(is_selected=False) compiles to NOT "is_selected", which a plain index cannot serve.
+            models.Index(fields=['id'], condition=Q(is_selected=False), name='newstudents_pending_idx'),
+            models.Index(fields=['email'], name='newstudents_email_idx'),
+        ]
 
 
 
@@ -345,7 +435,7 @@ class LessonStats(models.Model):
 
     @property
     def month_earnings(self):
-        if self.user.groups.filter(name='Teachers').exists():
+        if 'Teachers' in self.user.roles:
             return (
                 self.intermediate_lesson_rate * self.lessons_intermediate +
                 self.basic_lesson_rate * self.lessons +
@@ -357,7 +447,7 @@ class LessonStats(models.Model):
 
     @property
     def all_earnings(self):
-        if self.user.groups.filter(name='Teachers').exists():
+        if 'Teachers' in self.user.roles:
             return (
                 self.intermediate_lesson_rate * self.all_lessons_intermediate +
                 self.basic_lesson_rate * self.all_lessons +
@@ -398,6 +488,9 @@ class TeachersEarning(models.Model):
         verbose_name = 'STREFA KOREPETYCJI - Wypłaty'
         verbose_name_plural = 'STREFA KOREPETYCJI - Wypłaty'
         unique_together = ('user', 'month', 'year')
+        indexes = [
+            models.Index(fields=['user', 'year', 'month'], name='earning_user_year_month_idx'),
+        ]
 
 
 
@@ -439,6 +532,27 @@ class Resign(models.Model):
 
 
 
+class LessonQuerySet(models.QuerySet):
+    def dashboard(self, now):
+        """
+        Scheduled lessons ready for feed-component-teachers.html in one query (plus one prefetch of the course
+        students): upcoming ones first, soonest first, then past ones, latest first. Each lesson carries
+        `upcoming`, `correction_sent` and `message_count`.
+        """
+        upcoming = ExpressionWrapper(Q(event_datetime__gt=now), output_field=BooleanField())
+        return (
+            self.filter(event_datetime__isnull=False)
+            .select_related('host', 'course__subject')
+            .prefetch_related('course__students')
+            .annotate(
+                upcoming=upcoming,
+                correction_sent=Exists(LessonCorrection.objects.filter(lesson=OuterRef('pk'))),
+                message_count=Count('coursemessage'),
+            )
+            .order_by(F('upcoming').desc(), Case(When(upcoming=True, then='event_datetime')).asc(), '-event_datetime')
+        )
+
+
 class Lesson(models.Model):
     host = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True)
@@ -459,6 +573,8 @@ class Lesson(models.Model):
     invite_code = models.CharField(max_length=10, unique=True, blank=True)
     payment = models.IntegerField(default=0)
 
+    objects = LessonQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         """ Generowanie unikalnego invite_code """
         if not self.invite_code:
@@ -489,6 +605,11 @@ class Lesson(models.Model):
         ordering = ['-postUpdated', '-postCreated']
         verbose_name = 'STREFA KOREPETYCJI - Lekcje'
         verbose_name_plural = 'STREFA KOREPETYCJI - Lekcje'
+        indexes = [
+            models.Index(fields=['event_datetime'], name='lesson_event_idx'),
+            models.Index(fields=['host', 'event_datetime'], name='lesson_host_event_idx'),
+            models.Index(fields=['course', 'event_datetime'], name='lesson_course_event_idx'),
+        ]
 
 
 
@@ -505,6 +626,9 @@ class CourseMessage(models.Model):
         ordering = ['-messageUpdated', '-messageCreated']
         verbose_name = 'STREFA KOREPETYCJI - Komentarze'
         verbose_name_plural = 'STREFA KOREPETYCJI - Komentarze'
+        indexes = [
+            models.Index(fields=['room', 'messageCreated', 'id'], name='coursemessage_room_created_idx'),
+        ]
 
     def __str__(self):
         return self.body[0:50]
@@ -524,25 +648,34 @@ class LessonCorrection(models.Model):
 
 
 
+class AvailabilityQuerySet(models.QuerySet):
+    def covering(self, mask):
+        """Days on which every hour in `mask` is free: one `hours & mask = mask` predicate."""
+        return self.alias(free_in_slot=F('hours').bitand(mask)).filter(free_in_slot=mask)
+
+    def overlapping(self, mask):
+        """Days with at least one free hour in `mask`: `hours & mask <> 0`."""
+        return self.alias(free_in_slot=F('hours').bitand(mask)).exclude(free_in_slot=0)
+
+    def masks_by_user(self):
+        """`{user_id: {day: mask}}` for the whole queryset, read as (user_id, day, hours) tuples."""
+        masks = {}
+        for user_id, day, hours in self.values_list('user_id', 'day', 'hours').order_by():
+            masks.setdefault(user_id, {})[day] = hours
+        return masks
+
+
 class Availability(models.Model):
+    FIRST_HOUR = 6
+    LAST_HOUR = 22
+    # Names of the hourly checkboxes in the form and keys of get_availability's JSON; bit i is FIRST_HOUR + i.
+    HOUR_FIELDS = tuple(f'hour_{hour}_{hour + 1}' for hour in range(FIRST_HOUR, LAST_HOUR))
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     day = models.DateField()
-    hour_6_7 = models.BooleanField(default=False)
-    hour_7_8 = models.BooleanField(default=False)
-    hour_8_9 = models.BooleanField(default=False)
-    hour_9_10 = models.BooleanField(default=False)
-    hour_10_11 = models.BooleanField(default=False)
-    hour_11_12 = models.BooleanField(default=False)
-    hour_12_13 = models.BooleanField(default=False)
-    hour_13_14 = models.BooleanField(default=False)
-    hour_14_15 = models.BooleanField(default=False)
-    hour_15_16 = models.BooleanField(default=False)
-    hour_16_17 = models.BooleanField(default=False)
-    hour_17_18 = models.BooleanField(default=False)
-    hour_18_19 = models.BooleanField(default=False)
-    hour_19_20 = models.BooleanField(default=False)
-    hour_20_21 = models.BooleanField(default=False)
-    hour_21_22 = models.BooleanField(default=False)
+    hours = models.PositiveIntegerField(default=0, verbose_name="Godziny (bit 0 = 6:00-7:00)")
+
+    objects = AvailabilityQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user} - {self.day}"
@@ -550,6 +683,46 @@ class Availability(models.Model):
     class Meta:
         verbose_name = 'STREFA KOREPETYCJI - Dostępności'
         verbose_name_plural = 'STREFA KOREPETYCJI - Dostępności'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='availability_user_day_unique'),
+        ]
+
+    @classmethod
+    def slot_mask(cls, start, end):
+        """Mask of the hours from `start` to `end`, e.g. slot_mask(17, 19) covers 17:00-18:00 and 18:00-19:00."""
+        if not cls.FIRST_HOUR <= start < end <= cls.LAST_HOUR:
+            raise ValueError(f'Godziny muszą mieścić się w przedziale {cls.FIRST_HOUR}-{cls.LAST_HOUR}.')
+        return ((1 << (end - start)) - 1) << (start - cls.FIRST_HOUR)
+
+    @classmethod
+    def mask_from_flags(cls, flags):
+        return sum(1 << bit for bit, field in enumerate(cls.HOUR_FIELDS) if flags.get(field))
+
+    @classmethod
+    def flags_from_mask(cls, mask):
+        return {field: bool(mask >> bit & 1) for bit, field in enumerate(cls.HOUR_FIELDS)}
+
+    @classmethod
+    def hour_counts(cls, masks):
+        """How many of `masks` are free at each starting hour, `{hour: count}`."""
+        return {
+            cls.FIRST_HOUR + bit: sum(mask >> bit & 1 for mask in masks)
+            for bit in range(len(cls.HOUR_FIELDS))
+        }
+
+    @property
+    def hour_list(self):
+        """Starting hours of the free slots, e.g. [17, 18]."""
+        return [self.FIRST_HOUR + bit for bit in range(len(self.HOUR_FIELDS)) if self.hours >> bit & 1]
+
+    @classmethod
+    def save_days(cls, user, days):
+        """
+        Insert or overwrite the user's availability for each `{day: {hour_field: bool}}` entry with a single
+        INSERT ... ON CONFLICT (user, day) DO UPDATE. Hours missing from an entry are saved as unavailable.
+        """
+        rows = [cls(user=user, day=day, hours=cls.mask_from_flags(hours)) for day, hours in days.items()]
+        return cls.objects.bulk_create(rows, update_conflicts=True, unique_fields=['user', 'day'], update_fields=['hours'])
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~BLOG~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -582,8 +755,23 @@ class BlogPost(models.Model):
         return self.title
 
     def increment_views(self):
+        view_counter.record(self.pk)
         self.views += 1
-        self.save(update_fields=['views'])
+
+    @classmethod
+    def change_likes(cls, pk, delta):
+        """
+        Atomically add `delta` to likes in a single UPDATE ... RETURNING and return the new value.
+
+        Returns None when the post does not exist or the result would drop below zero.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {cls._meta.db_table} SET likes = likes + %s WHERE id = %s AND likes + %s >= 0 RETURNING likes",
+                [delta, pk, delta],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
 
     def get_similar_posts(self):
         return BlogPost.objects.filter(category=self.category).exclude(id=self.id)
@@ -595,6 +783,10 @@ class BlogPost(models.Model):
     class Meta:
         verbose_name = 'BLOG - Posty'
         verbose_name_plural = 'BLOG - Posty'
+        indexes = [
+            models.Index(fields=['category', 'created_at'], name='blogpost_category_created_idx'),
+            models.Index(fields=['created_at'], name='blogpost_created_idx'),
+        ]
 
 class ContentBlock(models.Model):
     TEXT = 'text'
@@ -0,0 +1,84 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination instead of OFFSET.
+
+    Every page is `WHERE (a, b) < (last_a, last_b) ORDER BY a, b LIMIT n`, so a deep page
+    costs the same as the first one. The last field in `ordering` must be unique (usually `id`),
+    otherwise rows sharing a value on a page boundary can be skipped.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created', '-id')):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, name) for name in self.fields]
+        raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.fields):
+                return None
+            return [self._to_python(name, value) for name, value in zip(self.fields, values)]
+        except (ValueError, TypeError, AttributeError, ValidationError):
+            return None
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Adnotacja (np. search_rank) - wartość z JSON-a jest już właściwego typu.
+            return value
+        return field.to_python(value)
+
+    def _after(self, values):
+        """Rows that come after `values` in `ordering` (lexicographic comparison)."""
+        conditions = []
+        for i, order in enumerate(self.ordering):
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            equal = dict(zip(self.fields[:i], values[:i]))
+            conditions.append(Q(**equal, **{f'{self.fields[i]}__{lookup}': values[i]}))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def get_page(self, cursor=None):
+        """Return the page after `cursor`; a missing or malformed cursor gives the first page."""
+        queryset = self.queryset
+        values = self.decode_cursor(cursor) if cursor else None
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+
+        return KeysetPage(object_list, next_cursor)
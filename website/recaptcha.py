@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `threshold` consecutive failures, for `cooldown` seconds.
+
+    After the cooldown one call is let through; success closes the breaker again, failure reopens it.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                # Half-open: let this call probe the upstream, keep the others out until it reports back.
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+
+class RecaptchaClient:
+    """
+    reCAPTCHA siteverify client shared by all requests of a worker process.
+
+    Keeps one pooled `requests.Session` (keep-alive to the verifier), uses RECAPTCHA_TIMEOUT for
+    connecting and for reading, retries only failures where the token cannot have been used
+    (connection errors, 502/503/504) and trips a circuit breaker when the verifier keeps failing.
+    When verification is not possible the result is RECAPTCHA_FAIL_OPEN.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self.breaker = CircuitBreaker(settings.RECAPTCHA_BREAKER_THRESHOLD, settings.RECAPTCHA_BREAKER_COOLDOWN)
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                retry = Retry(
+                    total=settings.RECAPTCHA_RETRIES,
+                    read=0,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(['POST']),
+                    backoff_factor=0.1,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_maxsize=settings.RECAPTCHA_POOL_SIZE, max_retries=retry)
+                self._session = requests.Session()
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+            return self._session
+
+    def verify(self, token, remote_ip=None):
+        if not token:
+            return False
+        if not self.breaker.allow():
+            logger.warning('reCAPTCHA: weryfikator niedostępny (circuit breaker otwarty).')
+            return settings.RECAPTCHA_FAIL_OPEN
+
+        data = {'secret': settings.RECAPTCHA_SECRET_KEY, 'response': token}
+        if remote_ip:
+            data['remoteip'] = remote_ip
+
+        try:
+            response = self.session.post(settings.RECAPTCHA_VERIFY_URL, data=data, timeout=settings.RECAPTCHA_TIMEOUT)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError):
+            logger.exception('reCAPTCHA: weryfikacja tokenu nie powiodła się.')
+            self.breaker.record_failure()
+            return settings.RECAPTCHA_FAIL_OPEN
+
+        self.breaker.record_success()
+        return bool(result.get('success', False))
+
+    async def averify(self, token, remote_ip=None):
+        # The pooled session is thread-safe for posting; run it outside the event loop.
+        return await sync_to_async(self.verify, thread_sensitive=False)(token, remote_ip)
+
+
+recaptcha = RecaptchaClient()
+
+
+def verify_recaptcha(token, remote_ip=None):
+    return recaptcha.verify(token, remote_ip)
+
+
+async def averify_recaptcha(token, remote_ip=None):
+    return await recaptcha.averify(token, remote_ip)
@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class RecaptchaStub:
+    """
+    Local stand-in for Google's siteverify endpoint, for tests and load tests without network access.
+
+    Tokens listed in `valid_tokens` (all tokens when it is None) verify successfully. `delay` makes every
+    answer slow, `status` makes every answer an HTTP error. `calls` counts handled requests.
+
+        with RecaptchaStub(valid_tokens={'ok'}) as stub, override_settings(RECAPTCHA_VERIFY_URL=stub.url):
+            ...
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, valid_tokens=None, delay=0, status=200):
+        self.valid_tokens = valid_tokens
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/recaptcha/api/siteverify'
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                with stub._lock:
+                    stub.calls += 1
+                length = int(self.headers.get('Content-Length', 0))
+                token = parse_qs(self.rfile.read(length).decode()).get('response', [''])[0]
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if stub.status != 200:
+                    body = b''
+                else:
+                    success = stub.valid_tokens is None or token in stub.valid_tokens
+                    body = json.dumps({'success': success}).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
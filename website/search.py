@@ -0,0 +1,265 @@
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+# Znaki bez rozkładu w Unicode, których NFKD nie sprowadzi do litery bazowej.
+POLISH_FOLD = str.maketrans({'ł': 'l', 'Ł': 'l'})
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+PG_WEIGHTS = 'ABCD'
+
+
+def normalize(text):
+    """Lowercase, fold Polish diacritics (ą→a, ł→l, ż→z...) and keep only word characters."""
+    text = unicodedata.normalize('NFKD', (text or '').translate(POLISH_FOLD))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def build_query(q):
+    """Turn user input into a backend query matching every word as a prefix, or None if nothing is left."""
+    words = normalize(q).split()
+    if not words:
+        return None
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{word}:*' for word in words)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class SearchIndex:
+    """
+    Full-text index kept next to `source_table`, one document per source row.
+
+    SQLite stores it in an FTS5 virtual table keyed by rowid, PostgreSQL in a table with a weighted
+    tsvector and a GIN index. Columns are listed from the most to the least important; the order
+    drives bm25 weights on SQLite and setweight() letters on PostgreSQL. The tables themselves are
+    created by migrations 0041 and 0042.
+    """
+
+    def __init__(self, table, source_table, columns, weights):
+        self.table = table
+        self.source_table = source_table
+        self.columns = columns
+        self.weights = weights
+
+    @property
+    def key(self):
+        return 'source_id' if connection.vendor == 'postgresql' else 'rowid'
+
+    def write(self, cursor, documents):
+        """Upsert `(source_id, (column texts...))` pairs; the texts must already be normalized."""
+        if connection.vendor == 'postgresql':
+            vector = ' || '.join(
+                f"setweight(to_tsvector('simple', %s), '{PG_WEIGHTS[i]}')" for i in range(len(self.columns))
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (source_id, document) VALUES (%s, {vector}) "
+                f"ON CONFLICT (source_id) DO UPDATE SET document = EXCLUDED.document",
+                [(source_id, *document) for source_id, document in documents],
+            )
+        else:
+            placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [(source_id,) for source_id, _ in documents]
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                [(source_id, *document) for source_id, document in documents],
+            )
+
+    def remove(self, source_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {self.key} = %s", [source_id])
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {self.table}")
+
+    def filter(self, queryset, q):
+        """
+        Restrict `queryset` to rows matching `q` and annotate `search_rank` (higher is better).
+
+        Matching runs once against the full-text index; the rank is looked up per returned row by
+        primary key, so ordering by `-search_rank` stays cheap on large tables.
+        """
+        query = build_query(q)
+        if query is None:
+            return queryset.none()
+
+        source_id = f"{self.source_table}.id"
+        if connection.vendor == 'postgresql':
+            matches = f"SELECT source_id FROM {self.table} WHERE document @@ to_tsquery('simple', %s)"
+            rank = (
+                f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {self.table} "
+                f"WHERE source_id = {source_id}"
+            )
+        else:
+            weights = ', '.join(str(weight) for weight in self.weights)
+            matches = f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s"
+            rank = (
+                f"SELECT -bm25({self.table}, {weights}) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s AND rowid = {source_id}"
+            )
+
+        return queryset.filter(id__in=RawSQL(matches, [query])).annotate(
+            search_rank=RawSQL(rank, [query], output_field=FloatField())
+        )
+
+
+ROOM_INDEX = SearchIndex(
+    'website_room_search', 'website_room', ('name', 'topic', 'description', 'messages'), (10.0, 5.0, 2.0, 1.0)
+)
+BLOG_INDEX = SearchIndex('website_blogpost_search', 'website_blogpost', ('title', 'content'), (10.0, 1.0))
+
+
+class _IndexBatch:
+    """Index jobs queued in one transaction, deduplicated and run by a single on_commit callback."""
+
+    def __init__(self):
+        self.jobs = set()
+        self.done = False
+
+    def run(self):
+        self.done = True
+        for index, source_id in self.jobs:
+            index(source_id)
+
+
+def _open_batch(db):
+    for _, func, _ in db.run_on_commit:
+        batch = getattr(func, '__self__', None)
+        if isinstance(batch, _IndexBatch) and not batch.done:
+            return batch
+    return None
+
+
+def index_on_commit(index, source_id):
+    """
+    Run `index(source_id)` once the current transaction commits (right away outside of one).
+
+    Every row of the same source that changes before the commit (e.g. all comments of a room removed
+    by one cascade delete) queues the same job, so the source is re-indexed once instead of per row.
+    The batch is found through the connection's own on_commit queue, so a rollback drops it together
+    with its callback.
+    """
+    batch = _open_batch(transaction.get_connection())
+    if batch is None:
+        batch = _IndexBatch()
+        batch.jobs.add((index, source_id))
+        transaction.on_commit(batch.run)
+    else:
+        batch.jobs.add((index, source_id))
+
+
+def _batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def _group_texts(pairs):
+    grouped = {}
+    for key, text in pairs:
+        grouped.setdefault(key, []).append(text or '')
+    return grouped
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ROOMS~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def room_document(room, message_bodies):
+    return (
+        normalize(room.name),
+        normalize(room.topic.name if room.topic else ''),
+        normalize(room.description),
+        normalize('\n'.join(message_bodies)),
+    )
+
+
+def index_room(room_id):
+    """Re-index a single room together with all of its comments; drops it from the index if it is gone."""
+    from .models import Room, Message
+
+    room = Room.objects.select_related('topic').filter(pk=room_id).first()
+    if room is None:
+        remove_room(room_id)
+        return
+
+    bodies = Message.objects.filter(room_id=room_id).order_by('id').values_list('body', flat=True)
+    with connection.cursor() as cursor:
+        ROOM_INDEX.write(cursor, [(room.id, room_document(room, bodies))])
+
+
+def remove_room(room_id):
+    ROOM_INDEX.remove(room_id)
+
+
+def rebuild_room_index(batch_size=500):
+    """Rebuild the whole index in batches; returns the number of indexed rooms."""
+    from .models import Room, Message
+
+    total = 0
+    with connection.cursor() as cursor:
+        ROOM_INDEX.clear(cursor)
+
+        for batch in _batches(Room.objects.select_related('topic'), batch_size):
+            messages = Message.objects.filter(room__in=batch).order_by('room_id', 'id').values_list('room_id', 'body')
+            bodies = _group_texts(messages)
+            ROOM_INDEX.write(cursor, [(room.id, room_document(room, bodies.get(room.id, []))) for room in batch])
+            total += len(batch)
+
+    return total
+
+
+def search_rooms(queryset, q):
+    return ROOM_INDEX.filter(queryset, q)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~BLOG~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def blog_post_document(post, texts):
+    return normalize(post.title), normalize('\n'.join(texts))
+
+
+def index_blog_post(post_id):
+    """Re-index a blog post with the text of all its content blocks."""
+    from .models import BlogPost, ContentBlock
+
+    post = BlogPost.objects.filter(pk=post_id).first()
+    if post is None:
+        remove_blog_post(post_id)
+        return
+
+    texts = ContentBlock.objects.filter(blog_post_id=post_id, text__isnull=False).values_list('text', flat=True)
+    with connection.cursor() as cursor:
+        BLOG_INDEX.write(cursor, [(post.id, blog_post_document(post, texts))])
+
+
+def remove_blog_post(post_id):
+    BLOG_INDEX.remove(post_id)
+
+
+def rebuild_blog_index(batch_size=500):
+    from .models import BlogPost, ContentBlock
+
+    total = 0
+    with connection.cursor() as cursor:
+        BLOG_INDEX.clear(cursor)
+
+        for batch in _batches(BlogPost.objects.all(), batch_size):
+            blocks = ContentBlock.objects.filter(blog_post__in=batch, text__isnull=False).order_by(
+                'blog_post_id', 'order'
+            ).values_list('blog_post_id', 'text')
+            texts = _group_texts(blocks)
+            BLOG_INDEX.write(cursor, [(post.id, blog_post_document(post, texts.get(post.id, []))) for post in batch])
+            total += len(batch)
+
+    return total
+
+
+def search_blog_posts(queryset, q):
+    return BLOG_INDEX.filter(queryset, q)
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+REFRESHED_AT_KEY = '_refreshed_at'
+
+
+def stamp_refresh(session):
+    session[REFRESHED_AT_KEY] = int(time.time())
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware with a sliding SESSION_COOKIE_AGE expiry that is not written on every request.
+
+    Every request that carries a session cookie counts as activity, whether or not the view read the
+    session. The session is saved when its data changed, or when it was last saved more than
+    SESSION_REFRESH_INTERVAL seconds ago, which pushes the expiry forward again. The idle timeout
+    therefore ends up between SESSION_COOKIE_AGE - SESSION_REFRESH_INTERVAL and SESSION_COOKIE_AGE.
+    Login stamps the session (see website.signals), so the first request after it does not write.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            accessed = session.accessed
+            refreshed_at = session.get(REFRESHED_AT_KEY)
+            # Loading drops the key of an expired or unknown session; there is nothing to refresh then.
+            if session.session_key and (
+                session.modified or refreshed_at is None
+                or time.time() - refreshed_at >= settings.SESSION_REFRESH_INTERVAL
+            ):
+                stamp_refresh(session)
+            # Reading the stamp alone must not add Vary: Cookie to pages that never used the session.
+            session.accessed = accessed
+        return super().process_response(request, response)
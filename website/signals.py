@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import search
+from .caching import invalidate_blog_sidebar
+from .sessions import stamp_refresh
+from .models import User, Room, Message, Topic, BlogPost, BlogCategory, ContentBlock, count_subquery
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    # Only the site's own database: copy_database reads the old SQLite file through a second alias and must
+    # leave its journal mode alone.
+    if connection.vendor != 'sqlite' or connection.alias != DEFAULT_DB_ALIAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(user_logged_in)
+def session_logged_in(sender, request, user, **kwargs):
+    # The login already saves the session; stamping it here spares the next request a refresh write.
+    stamp_refresh(request.session)
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, **kwargs):
+    search.index_room(instance.pk)
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted(sender, instance, **kwargs):
+    search.remove_room(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def message_changed(sender, instance, **kwargs):
+    search.index_on_commit(search.index_room, instance.room_id)
+
+
+@receiver(post_save, sender=Topic)
+def topic_saved(sender, instance, created, **kwargs):
+    if not created:
+        for room_id in instance.room_set.values_list('id', flat=True):
+            search.index_room(room_id)
+
+
+@receiver(post_save, sender=BlogPost)
+def blog_post_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        search.index_blog_post(instance.pk)
+
+
+@receiver(post_delete, sender=BlogPost)
+def blog_post_deleted(sender, instance, **kwargs):
+    search.remove_blog_post(instance.pk)
+
+
+@receiver(post_save, sender=ContentBlock)
+@receiver(post_delete, sender=ContentBlock)
+def content_block_changed(sender, instance, **kwargs):
+    search.index_on_commit(search.index_blog_post, instance.blog_post_id)
+
+
+@receiver(post_save, sender=BlogPost)
+def blog_post_created(sender, instance, created, **kwargs):
+    # created_at is auto_now_add, so archive dates only change when a post is added or removed.
+    if created:
+        invalidate_blog_sidebar()
+
+
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def blog_sidebar_changed(sender, **kwargs):
+    invalidate_blog_sidebar()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~COUNTERS~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def track_m2m_count(model, field_name, counter):
+    """
+    Keep `model.<counter>` equal to the number of rows in the `field_name` M2M, from either side.
+
+    post_add only reports rows that were really inserted, so it is a plain F() increment. post_remove
+    reports every requested id (also ones that were not linked), so removals recount from the through table.
+    """
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    fk_name, other_fk_name = field.m2m_field_name(), field.m2m_reverse_field_name()
+
+    def recount(ids):
+        model.objects.filter(pk__in=ids).update(**{counter: count_subquery(through.objects.all(), fk_name)})
+
+    @receiver(m2m_changed, sender=through, weak=False)
+    def changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if action == 'post_add' and pk_set:
+            if reverse:
+                model.objects.filter(pk__in=pk_set).update(**{counter: F(counter) + 1})
+            else:
+                model.objects.filter(pk=instance.pk).update(**{counter: F(counter) + len(pk_set)})
+        elif action == 'post_remove' and pk_set:
+            recount(pk_set if reverse else [instance.pk])
+        elif action == 'pre_clear' and reverse:
+            instance._cleared_ids = list(
+                through.objects.filter(**{other_fk_name: instance.pk}).values_list(fk_name, flat=True)
+            )
+        elif action == 'post_clear':
+            recount(getattr(instance, '_cleared_ids', []) if reverse else [instance.pk])
+
+
+track_m2m_count(Room, 'likes', 'likes_count')
+track_m2m_count(Room, 'participants', 'participants_count')
+track_m2m_count(Message, 'likes', 'likes_count')
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    if created:
+        Room.objects.filter(pk=instance.room_id).update(messages_count=F('messages_count') + 1)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    Room.objects.filter(pk=instance.room_id, messages_count__gt=0).update(messages_count=F('messages_count') - 1)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, **kwargs):
+    # Only the instance that changed can be refreshed; other copies keep their roles until they are reloaded.
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        instance.__dict__.pop('roles', None)
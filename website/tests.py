@@ -1,3 +1,916 @@
-from django.test import TestCase
+import asyncio
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import (PlatformMessage, User, Room, RoomQuerySet, Topic, Message, BlogPost, BlogCategory, ContentBlock, Course, Lesson,
+                     CourseMessage, NewStudents, Availability, TeachersEarning, LessonCorrection)
+from .counters import ViewCounter, view_counter
+from .likes import LIKERS_PER_PAGE
+from .forms import availability_window
+from .matching import suggestions_for_teacher
+from .recaptcha import RecaptchaClient
+from .recaptcha_stub import RecaptchaStub
+from .views import COMMENTS_PAGE_SIZE, claim_student
+from .pagination import KeysetPaginator
+from .search import search_rooms, remove_room
+
+LOCK_RETRIES = 200
+LOCK_RETRY_DELAY = 0.005
+
+
+def retry_locked(operation):
+    """
+    Run `operation`, retrying while the database is locked. The shared in-memory SQLite database used by
+    TransactionTestCase reports a lock instead of waiting like a file on disk does. Gives up after
+    LOCK_RETRIES attempts and re-raises the last error.
+    """
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return operation()
+        except OperationalError:
+            if attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(LOCK_RETRY_DELAY)
+
+
+class KnowledgeZoneFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Matematyka', svg_icon='icons/19.svg')
+        cls.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='haslo12345')
+            for i in range(5)
+        ]
+
+    def create_rooms(self, count):
+        for i in range(count):
+            room = Room.objects.create(host=self.users[i % 5], topic=self.topic, name=f'Post {i}', description='Opis')
+            room.participants.add(*self.users)
+            room.likes.add(*self.users[:2])
+            Message.objects.create(user=self.users[0], room=room, body='Odpowiedź')
+
+    def count_feed_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:knowledge_zone'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_feed_counters_and_participants(self):
+        self.create_rooms(1)
+        room = Room.objects.feed().get()
+        self.assertEqual((room.likes_count, room.messages_count, room.participants_count), (2, 1, 5))
+        self.assertEqual(len(room.feed_participants), RoomQuerySet.FEED_PARTICIPANTS)
+
+    def test_feed_query_count_does_not_grow_with_rooms(self):
+        self.create_rooms(2)
+        small_feed = self.count_feed_queries()
+        self.create_rooms(8)
+        self.assertEqual(self.count_feed_queries(), small_feed)
+
+    def test_feed_more_walks_all_rooms_without_offset(self):
+        self.create_rooms(25)
+        seen, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('schoolweb:knowledge_zone_more'), {'cursor': cursor or ''})
+            data = response.json()
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+            seen.append(data['html'].count('class="roomListRoom"'))
+            if not data['has_next']:
+                break
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [10, 10, 5])
+
+    def test_feed_more_pages_through_ranked_search(self):
+        self.create_rooms(12)
+        url = reverse('schoolweb:knowledge_zone_more')
+        first = self.client.get(url, {'q': 'post'}).json()
+        second = self.client.get(url, {'q': 'post', 'cursor': first['next_cursor']}).json()
+        self.assertEqual(first['html'].count('class="roomListRoom"') + second['html'].count('class="roomListRoom"'), 12)
+        self.assertFalse(second['has_next'])
+
+    def test_keyset_page_order_matches_feed(self):
+        self.create_rooms(7)
+        paginator = KeysetPaginator(Room.objects.all(), 3)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        expected = list(Room.objects.order_by('-created', '-id').values_list('id', flat=True))
+        self.assertEqual([room.id for room in list(first) + list(second)], expected[:6])
+        self.assertEqual(len(paginator.get_page('zepsuty-kursor')), 3)
+
+
+class RoomSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Geografia', svg_icon='icons/19.svg')
+        cls.user = User.objects.create_user(username='autor', email='autor@example.com', password='haslo12345')
+
+    def search(self, q):
+        return list(search_rooms(Room.objects.all(), q).order_by('-search_rank', '-id').values_list('name', flat=True))
+
+    def test_polish_diacritics_and_prefixes(self):
+        Room.objects.create(host=self.user, topic=self.topic, name='Łódź i okolice', description='Żółta mapa')
+        self.assertEqual(self.search('lodz'), ['Łódź i okolice'])
+        self.assertEqual(self.search('ZÓŁT'), ['Łódź i okolice'])
+        self.assertEqual(self.search('geogr'), ['Łódź i okolice'])
+        self.assertEqual(self.search('"; DROP'), [])
+
+    def test_index_follows_messages_and_deletes(self):
+        room = Room.objects.create(host=self.user, topic=self.topic, name='Pytanie', description='')
+        with self.captureOnCommitCallbacks(execute=True):
+            message = Message.objects.create(user=self.user, room=room, body='Wyżyna Lubelska')
+        self.assertEqual(self.search('lubelska'), ['Pytanie'])
+        with self.captureOnCommitCallbacks(execute=True):
+            message.delete()
+        self.assertEqual(self.search('lubelska'), [])
+        room.delete()
+        self.assertEqual(self.search('pytanie'), [])
+
+    def test_cascade_delete_does_not_reindex_per_message(self):
+        room = Room.objects.create(host=self.user, topic=self.topic, name='Stare pytanie', description='')
+        Message.objects.bulk_create([Message(user=self.user, room=room, body=f'Odpowiedź {i}') for i in range(20)])
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            room.delete()
+        index_queries = [query for query in queries if 'website_room_search' in query['sql']]
+        self.assertLessEqual(len(index_queries), 2)
+        self.assertEqual(self.search('stare'), [])
+
+    def test_rolled_back_changes_leave_no_index_jobs(self):
+        rolled_back = Room.objects.create(host=self.user, topic=self.topic, name='Wycofane', description='')
+        room = Room.objects.create(host=self.user, topic=self.topic, name='Zatwierdzone', description='')
+        with transaction.atomic():
+            Message.objects.create(user=self.user, room=rolled_back, body='Wycofana odpowiedź')
+            transaction.set_rollback(True)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(user=self.user, room=room, body='Odpowiedź')
+        index_queries = [query for query in queries if 'website_room_search' in query['sql']]
+        self.assertLessEqual(len(index_queries), 2)
+
+    def test_title_match_ranks_above_description_match(self):
+        Room.objects.create(host=self.user, topic=self.topic, name='Inny temat', description='Wulkany na świecie')
+        Room.objects.create(host=self.user, topic=self.topic, name='Wulkany', description='Opis')
+        self.assertEqual(self.search('wulkany'), ['Wulkany', 'Inny temat'])
+
+    def test_rebuild_command(self):
+        room = Room.objects.create(host=self.user, topic=self.topic, name='Rzeki Polski', description='')
+        remove_room(room.id)
+        self.assertEqual(self.search('rzeki'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('rzeki'), ['Rzeki Polski'])
+
+
+class BlogListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='bloger', email='bloger@example.com', password='haslo12345')
+        cls.category = BlogCategory.objects.create(name='Matura')
+        for title, created_at in [
+            ('Styczeń 2024', datetime(2024, 1, 15, 10)),
+            ('Luty 2024', datetime(2024, 2, 29, 23, 59)),
+            ('Luty 2025', datetime(2025, 2, 15, 8)),
+            ('Grudzień 2025', datetime(2025, 12, 31, 12)),
+        ]:
+            post = BlogPost.objects.create(title=title, slug='wpis', author=cls.author, category=cls.category)
+            BlogPost.objects.filter(pk=post.pk).update(created_at=created_at)
+
+    def setUp(self):
+        cache.clear()
+
+    def list_titles(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:blog-post-list'), params)
+        sql = ' '.join(query['sql'] for query in queries if 'website_blogpost' in query['sql'])
+        self.assertNotIn('django_datetime_extract', sql)
+        return sorted(post.title for post in response.context['blog_posts'])
+
+    def test_archive_filters_use_date_ranges(self):
+        self.assertEqual(self.list_titles(year=2024), ['Luty 2024', 'Styczeń 2024'])
+        self.assertEqual(self.list_titles(year=2025, month=12), ['Grudzień 2025'])
+        self.assertEqual(self.list_titles(month=2), ['Luty 2024', 'Luty 2025'])
+        self.assertEqual(self.list_titles(year=2024, month=2, day=29), ['Luty 2024'])
+        self.assertEqual(self.list_titles(day=15), ['Luty 2025', 'Styczeń 2024'])
+        self.assertEqual(self.list_titles(month=13), [])
+
+    def test_search_covers_content_blocks(self):
+        post = BlogPost.objects.get(title='Luty 2025')
+        with self.captureOnCommitCallbacks(execute=True):
+            ContentBlock.objects.create(blog_post=post, block_type=ContentBlock.TEXT, order=1, text='Zadania z logarytmów')
+        self.assertEqual(self.list_titles(q='logarytm'), ['Luty 2025'])
+        self.assertEqual(self.list_titles(q='styczen'), ['Styczeń 2024'])
+
+    def test_sidebar_is_cached_until_posts_change(self):
+        url = reverse('schoolweb:blog-post-list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        sidebar_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT "website_blogcategory"') or 'django_datetime_trunc' in query['sql']
+        ]
+        self.assertEqual(sidebar_queries, [])
+        self.assertEqual([d.year for d in response.context['years']], [2024, 2025])
+
+        BlogPost.objects.create(title='Nowy', slug='nowy', author=self.author, category=self.category)
+        response = self.client.get(url)
+        self.assertEqual([d.year for d in response.context['years']][-1], datetime.now().year)
+
+
+class BlogViewCounterTests(TransactionTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='bloger', email='bloger@example.com', password='haslo12345')
+        category = BlogCategory.objects.create(name='Matura')
+        self.post = BlogPost.objects.create(title='Wpis', slug='wpis', author=author, category=category)
+
+    def tearDown(self):
+        # view_counter is shared by the whole process: don't leave hits or an armed timer to the next test.
+        view_counter.flush()
+
+    @override_settings(BLOG_VIEWS_FLUSH_INTERVAL=0)
+    def test_no_views_lost_under_concurrent_requests(self):
+        def visit():
+            # Każdy wątek to osobne żądanie z własną instancją wpisu; przy interwale 0 każde trafienie próbuje też zapisu.
+            for _ in range(50):
+                BlogPost(pk=self.post.pk).increment_views()
+            connection.close()
+
+        threads = [threading.Thread(target=visit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        view_counter.flush()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 400)
+
+    def test_hits_are_buffered_until_flush(self):
+        for _ in range(3):
+            self.post.increment_views()
+        self.assertEqual(BlogPost.objects.get(pk=self.post.pk).views, 0)
+        self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(BlogPost.objects.get(pk=self.post.pk).views, 3)
+
+    @override_settings(BLOG_VIEWS_FLUSH_INTERVAL=0.2)
+    def test_idle_worker_flushes_on_timer(self):
+        counter = ViewCounter()
+        counter.record(self.post.pk)
+        timer = counter._timer
+        self.assertEqual(BlogPost.objects.get(pk=self.post.pk).views, 0)
+        timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertEqual(BlogPost.objects.get(pk=self.post.pk).views, 1)
+
+    def test_flush_disarms_timer(self):
+        counter = ViewCounter()
+        counter.record(self.post.pk)
+        timer = counter._timer
+        self.assertEqual(counter.flush(), 1)
+        self.assertIsNone(counter._timer)
+        timer.join(5)
+        self.assertEqual(BlogPost.objects.get(pk=self.post.pk).views, 1)
+
+
+class BlogLikeTests(TransactionTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='bloger', email='bloger@example.com', password='haslo12345')
+        category = BlogCategory.objects.create(name='Matura')
+        self.post = BlogPost.objects.create(title='Wpis', slug='wpis', author=author, category=category)
+
+    def test_like_toggle_uses_cookie_and_single_update(self):
+        url = reverse('schoolweb:like-post', args=[self.post.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).json(), {'likes': 1, 'liked': True})
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.client.get(url).json(), {'likes': 0, 'liked': False})
+        self.assertEqual(BlogPost.change_likes(self.post.pk, -1), None)
+        self.assertEqual(self.client.get(reverse('schoolweb:like-post', args=[999])).status_code, 404)
+
+    def test_parallel_likes_are_not_lost(self):
+        errors = []
+
+        def like_many():
+            try:
+                for _ in range(50):
+                    retry_locked(lambda: BlogPost.change_likes(self.post.pk, 1))
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=like_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 400)
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Fizyka', svg_icon='icons/19.svg')
+        cls.users = [
+            User.objects.create_user(username=f'fizyk{i}', email=f'fizyk{i}@example.com', password='haslo12345')
+            for i in range(3)
+        ]
+
+    def counters(self, room):
+        room.refresh_from_db()
+        return room.likes_count, room.messages_count, room.participants_count
+
+    def test_counters_follow_m2m_and_messages(self):
+        room = Room.objects.create(host=self.users[0], topic=self.topic, name='Pęd')
+        room.likes.add(*self.users)
+        room.likes.add(self.users[0])
+        room.participants.add(self.users[1])
+        self.users[2].participants.add(room)
+        message = Message.objects.create(user=self.users[1], room=room, body='Odpowiedź')
+        self.assertEqual(self.counters(room), (3, 1, 2))
+
+        room.likes.remove(self.users[0], self.users[0])
+        self.users[1].liked_rooms.clear()
+        room.participants.clear()
+        message.likes.add(self.users[0])
+        message.toggle_like(self.users[1])
+        message.refresh_from_db()
+        self.assertEqual(message.likes_count, 2)
+        message.delete()
+        self.assertEqual(self.counters(room), (1, 0, 0))
+
+    def test_full_save_does_not_overwrite_counters(self):
+        room = Room.objects.create(host=self.users[0], topic=self.topic, name='Pęd')
+        stale = Room.objects.get(pk=room.pk)
+        room.likes.add(self.users[1])
+        stale.name = 'Energia'
+        stale.save()
+        self.assertEqual(self.counters(room), (1, 0, 0))
+
+    def test_reconcile_command(self):
+        room = Room.objects.create(host=self.users[0], topic=self.topic, name='Pęd')
+        room.likes.add(self.users[1])
+        Room.objects.update(likes_count=42, messages_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.counters(room), (1, 0, 0))
+
+
+class LikeToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Chemia', svg_icon='icons/19.svg')
+        cls.user = User.objects.create_user(username='chemik', email='chemik@example.com', password='haslo12345')
+        cls.room = Room.objects.create(host=cls.user, topic=cls.topic, name='Mole')
+        cls.message = Message.objects.create(user=cls.user, room=cls.room, body='Odpowiedź')
+
+    def test_toggle_room_like_without_loading_likers(self):
+        self.client.force_login(self.user)
+        url = reverse('schoolweb:toggle_like_room', args=[self.room.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.json(), {'liked': True, 'likes_count': 1})
+        self.assertFalse(any('SELECT' in query['sql'] and 'website_room_likes' in query['sql'] for query in queries))
+        self.assertEqual(self.client.post(url).json(), {'liked': False, 'likes_count': 0})
+        self.assertEqual(self.client.post(reverse('schoolweb:toggle_like_room', args=[0])).status_code, 404)
+
+    def test_message_like_does_not_bump_updated(self):
+        updated = Message.objects.get(pk=self.message.pk).updated
+        self.assertTrue(self.message.toggle_like(self.user))
+        self.assertEqual(self.message.likes_count, 1)
+        self.assertFalse(self.message.toggle_like(self.user))
+        message = Message.objects.get(pk=self.message.pk)
+        self.assertEqual((message.likes_count, message.updated), (0, updated))
+
+
+class LikerListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Biologia', svg_icon='icons/19.svg')
+        cls.users = User.objects.bulk_create(
+            User(username=f'biolog{i}', email=f'biolog{i}@example.com') for i in range(LIKERS_PER_PAGE + 5)
+        )
+        cls.room = Room.objects.create(host=cls.users[0], topic=cls.topic, name='Komórka')
+        cls.messages = [Message.objects.create(user=cls.users[0], room=cls.room, body='Odpowiedź') for _ in range(3)]
+        for user in cls.users:
+            cls.messages[0].likes.add(user)
+        cls.messages[1].likes.add(cls.users[0])
+
+    def test_liker_list_is_paginated(self):
+        url = reverse('schoolweb:get_likes', args=[self.messages[0].pk])
+        first = self.client.get(url).json()
+        rest = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['liked_users']), LIKERS_PER_PAGE)
+        self.assertIsNone(rest['next_cursor'])
+        self.assertEqual(
+            [user['username'] for user in first['liked_users'] + rest['liked_users']],
+            [user.username for user in reversed(self.users)],
+        )
+
+    def test_batch_returns_all_messages_in_one_query(self):
+        ids = ','.join(str(message.pk) for message in self.messages)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('schoolweb:get_likes_batch'), {'ids': ids}).json()['likes']
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            [len(data[str(message.pk)]['liked_users']) for message in self.messages], [LIKERS_PER_PAGE, 1, 0]
+        )
+        self.assertIsNotNone(data[str(self.messages[0].pk)]['next_cursor'])
+        self.assertEqual(self.client.get(reverse('schoolweb:get_likes_batch'), {'ids': 'x'}).status_code, 400)
+
+
+class RoomPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Geografia', svg_icon='icons/19.svg')
+        cls.users = [
+            User.objects.create_user(username=f'geograf{i}', email=f'geograf{i}@example.com', password='haslo12345')
+            for i in range(3)
+        ]
+        cls.room = Room.objects.create(host=cls.users[0], topic=cls.topic, name='Klimat')
+        cls.room.participants.add(*cls.users)
+        cls.room.likes.add(cls.users[0])
+
+    def add_messages(self, count):
+        for i in range(count):
+            message = Message.objects.create(user=self.users[i % 3], room=self.room, body='Odpowiedź')
+            message.likes.add(*self.users[:i % 3])
+
+    def count_room_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:room', args=[self.room.pk]))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_thread(self):
+        self.client.force_login(self.users[0])
+        self.add_messages(2)
+        # Warm-up, so neither measured request pays for one-off middleware work such as a session refresh.
+        self.count_room_queries()
+        short_thread = self.count_room_queries()
+        self.add_messages(20)
+        self.assertEqual(self.count_room_queries(), short_thread)
+
+    def test_liked_flags(self):
+        self.client.force_login(self.users[0])
+        self.add_messages(3)
+        response = self.client.get(reverse('schoolweb:room', args=[self.room.pk]))
+        self.assertTrue(response.context['room'].liked_by_user)
+        self.assertEqual([message.liked_by_user for message in response.context['room_messages']], [False, True, True])
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name='Historia', svg_icon='icons/19.svg')
+        cls.teacher = User.objects.create_user(username='historyk', email='historyk@example.com', password='haslo12345')
+        cls.outsider = User.objects.create_user(username='gosc', email='gosc@example.com', password='haslo12345')
+        cls.room = Room.objects.create(host=cls.teacher, topic=cls.topic, name='Rozbiory')
+        cls.course = Course.objects.create(name='Historia', teacher=cls.teacher)
+        cls.lesson = Lesson.objects.create(host=cls.teacher, course=cls.course, title='Rozbiory')
+        for i in range(COMMENTS_PAGE_SIZE * 2 + 5):
+            Message.objects.create(user=cls.teacher, room=cls.room, body=f'Komentarz {i}')
+            CourseMessage.objects.create(user=cls.teacher, room=cls.lesson, body=f'Komentarz {i}')
+
+    def walk(self, url, cursor, direction):
+        bodies = []
+        while cursor:
+            data = self.client.get(url, {'cursor': cursor, 'direction': direction}).json()
+            bodies.append(data['html'].count('class="thread"'))
+            cursor = data['next_cursor'] if data['has_next'] else None
+        return bodies
+
+    def test_room_shows_newest_page_and_loads_older(self):
+        response = self.client.get(reverse('schoolweb:room', args=[self.room.pk]))
+        bodies = [message.body for message in response.context['room_messages']]
+        self.assertEqual(bodies[-1], f'Komentarz {COMMENTS_PAGE_SIZE * 2 + 4}')
+        self.assertEqual(len(bodies), COMMENTS_PAGE_SIZE)
+
+        url = reverse('schoolweb:room-comments', args=[self.room.pk])
+        self.assertEqual(self.walk(url, response.context['older_cursor'], 'older'), [COMMENTS_PAGE_SIZE, 5])
+
+        newer_cursor = response.context['newer_cursor']
+        Message.objects.create(user=self.teacher, room=self.room, body='Nowy komentarz')
+        data = self.client.get(url, {'cursor': newer_cursor, 'direction': 'newer'}).json()
+        self.assertIn('Nowy komentarz', data['html'])
+        self.assertNotEqual(data['next_cursor'], newer_cursor)
+
+    def test_lesson_comments_require_course_membership(self):
+        url = reverse('schoolweb:lesson-comments', args=[self.lesson.pk])
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.teacher)
+        data = self.client.get(url).json()
+        self.assertEqual(data['html'].count('class="thread"'), COMMENTS_PAGE_SIZE)
+        self.assertEqual(self.walk(url, data['next_cursor'], 'older'), [COMMENTS_PAGE_SIZE, 5])
+
+    def test_lesson_without_course_is_forbidden(self):
+        lesson = Lesson.objects.create(host=self.teacher, course=None, title='Sierota')
+        self.client.force_login(self.teacher)
+        for name in ('schoolweb:lesson', 'schoolweb:lesson-comments'):
+            self.assertEqual(self.client.get(reverse(name, args=[lesson.pk])).status_code, 403)
+
+    def test_forbidden_lesson_does_not_load_comments(self):
+        self.client.force_login(self.outsider)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:lesson', args=[self.lesson.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(any('website_coursemessage' in query['sql'] for query in queries))
+
+
+@override_settings(RECAPTCHA_TIMEOUT=(0.5, 0.5), RECAPTCHA_RETRIES=0, RECAPTCHA_BREAKER_THRESHOLD=2,
+                   RECAPTCHA_BREAKER_COOLDOWN=60, RECAPTCHA_FAIL_OPEN=False)
+class RecaptchaTests(TestCase):
+    def test_verifies_tokens_against_stub(self):
+        with RecaptchaStub(valid_tokens={'dobry'}) as stub, self.settings(RECAPTCHA_VERIFY_URL=stub.url):
+            client = RecaptchaClient()
+            self.assertTrue(client.verify('dobry'))
+            self.assertFalse(client.verify('zly'))
+            self.assertTrue(asyncio.run(client.averify('dobry')))
+            self.assertFalse(client.verify(''))
+        self.assertEqual(stub.calls, 3)
+
+    def test_slow_verifier_times_out_and_trips_breaker(self):
+        with RecaptchaStub(delay=2) as stub, self.settings(RECAPTCHA_VERIFY_URL=stub.url):
+            client = RecaptchaClient()
+            started = time.monotonic()
+            self.assertFalse(client.verify('dobry'))
+            self.assertFalse(client.verify('dobry'))
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertTrue(client.breaker.is_open)
+            self.assertFalse(client.verify('dobry'))
+        self.assertEqual(stub.calls, 2)
+
+    def test_server_errors_fail_closed(self):
+        with RecaptchaStub(status=503) as stub, self.settings(RECAPTCHA_VERIFY_URL=stub.url):
+            self.assertFalse(RecaptchaClient().verify('dobry'))
+            with self.settings(RECAPTCHA_FAIL_OPEN=True):
+                self.assertTrue(RecaptchaClient().verify('dobry'))
+
+
+class AsyncRecaptchaViewTests(TestCase):
+    def setUp(self):
+        self.stub = RecaptchaStub(valid_tokens={'dobry'}).start()
+        self.addCleanup(self.stub.stop)
+        overrides = self.settings(RECAPTCHA_VERIFY_URL=self.stub.url)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_user_message(self):
+        url = reverse('schoolweb:user-message')
+        data = {'email': 'jan@example.com', 'message': 'Dzień dobry', 'g-recaptcha-response': 'zly'}
+        self.assertEqual(self.client.post(url, data).status_code, 400)
+        self.assertEqual(self.client.post(url, {**data, 'g-recaptcha-response': 'dobry'}).status_code, 200)
+        self.assertEqual(PlatformMessage.objects.get().email, 'jan@example.com')
+
+    def test_login(self):
+        User.objects.create_user(username='jan', email='jan@example.com', password='haslo12345')
+        url = reverse('schoolweb:login')
+        data = {'email': 'jan@example.com', 'password': 'haslo12345', 'g-recaptcha-response': 'zly'}
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        response = self.client.post(url, {**data, 'g-recaptcha-response': 'dobry'})
+        self.assertRedirects(response, reverse('schoolweb:knowledge_zone'), fetch_redirect_response=False)
+        self.assertIn('_auth_user_id', self.client.session)
+
+
+class UserRolesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='nauczyciel', email='nauczyciel@example.com', password='haslo12345')
+        cls.teacher.groups.add(Group.objects.create(name='Teachers'))
+
+    def test_roles_are_loaded_once_and_refreshed_on_change(self):
+        user = User.objects.get(pk=self.teacher.pk)
+        with self.assertNumQueries(1):
+            self.assertIn('Teachers', user.roles)
+            self.assertNotIn('Students', user.roles)
+        user.groups.add(Group.objects.create(name='Students'))
+        self.assertEqual(user.roles, {'Teachers', 'Students'})
+
+    def test_request_roles_cost_one_query(self):
+        response = self.client.get(reverse('schoolweb:knowledge_zone'))
+        self.assertEqual(response.wsgi_request.user_roles, frozenset())
+
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:knowledge_zone'))
+        self.assertEqual(response.wsgi_request.user_roles, {'Teachers'})
+        self.assertEqual(sum('auth_group' in query['sql'] for query in queries), 1)
+
+
+class NavigationContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer = User.objects.create_user(username='pisarz', email='pisarz@example.com', password='haslo12345')
+        cls.writer.groups.add(Group.objects.create(name='Writers'))
+
+    def test_targets_follow_roles(self):
+        response = self.client.get(reverse('schoolweb:knowledge_zone'))
+        self.assertEqual(response.context['user_redirect_url'](), reverse('schoolweb:applyUser'))
+
+        self.client.force_login(self.writer)
+        response = self.client.get(reverse('schoolweb:knowledge_zone'))
+        self.assertEqual(response.context['user_redirect_url'](), reverse('schoolweb:WriterToTutoringZone'))
+        self.assertEqual(response.context['navbar_template'](), 'tutoring-zone/nav-no-search.html')
+        self.assertContains(self.client.get(reverse('schoolweb:home')), reverse('schoolweb:WriterToTutoringZone'))
+
+
+class SlidingSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='sesja', email='sesja@example.com', password='haslo12345')
+
+    def session_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('schoolweb:blog-post-list'))
+        return sum(query['sql'].startswith('UPDATE') and 'django_session' in query['sql'] for query in queries)
+
+    def test_unchanged_session_is_saved_only_after_refresh_interval(self):
+        self.client.force_login(self.user)
+        # Login stamps the session, so even the first request afterwards does not write it.
+        self.assertEqual(self.session_writes(), 0)
+
+        # The blog list never reads the session, yet the expiry still slides.
+        with self.settings(SESSION_REFRESH_INTERVAL=0):
+            self.assertEqual(self.session_writes(), 1)
+        self.assertEqual(self.session_writes(), 0)
+
+    def test_anonymous_request_creates_no_session(self):
+        response = self.client.get(reverse('schoolweb:blog-post-list'))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class SqlitePragmaTests(TestCase):
+    def test_connection_is_tuned(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size'])
+
+
+class QueryPlanTests(TestCase):
+    """The hot lookups must be answered from an index, never by scanning the whole table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', email='plan@example.com')
+        cls.topic = Topic.objects.create(name='Plan')
+        cls.room = Room.objects.create(host=cls.user, topic=cls.topic, name='Plan')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plans are checked with SQLite EXPLAIN QUERY PLAN')
+
+    def assertNoFullScan(self, queryset):
+        table = queryset.model._meta.db_table
+        plan = queryset.explain()
+        self.assertIn(table, plan)
+        self.assertIsNone(re.search(rf'SCAN (TABLE )?{table}( AS \w+)?$', plan, re.MULTILINE), plan)
+
+    def test_lesson_lookups(self):
+        now = datetime.now()
+        courses = Course.objects.filter(students=self.user)
+        self.assertNoFullScan(Lesson.objects.filter(host=self.user, event_datetime__gt=now).order_by('event_datetime'))
+        self.assertNoFullScan(Lesson.objects.filter(host=self.user, event_datetime__gte=datetime(2026, 1, 1),
+                                                    event_datetime__lt=datetime(2026, 2, 1)))
+        self.assertNoFullScan(Lesson.objects.filter(course__in=courses, event_datetime__lte=now).order_by('-event_datetime'))
+        self.assertNoFullScan(Lesson.objects.filter(event_datetime__gte=now, event_datetime__lte=now))
+
+    def test_knowledge_zone_lookups(self):
+        self.assertNoFullScan(Message.objects.order_by('-created')[:12])
+        self.assertNoFullScan(Message.objects.filter(room=self.room).order_by('-created', '-id')[:20])
+        self.assertNoFullScan(Room.objects.filter(level='basic').order_by('-created', '-id')[:10])
+        self.assertNoFullScan(Room.objects.filter(topic=self.topic, level='basic').exclude(id=self.room.id)[:4])
+
+    def test_tutoring_lookups(self):
+        self.assertNoFullScan(NewStudents.objects.filter(is_selected=False))
+        self.assertNoFullScan(NewStudents.objects.filter(email='plan@example.com'))
+        self.assertNoFullScan(Availability.objects.filter(user=self.user, day=date(2026, 1, 1)))
+        self.assertNoFullScan(TeachersEarning.objects.filter(user=self.user).order_by('-year', '-month'))
+        self.assertNoFullScan(CourseMessage.objects.filter(room_id=1).order_by('-messageCreated', '-id')[:20])
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dostepny', email='dostepny@example.com')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_resubmitting_a_day_overwrites_it(self):
+        for hours in ({'hour_17_18': 'on', 'hour_18_19': 'on'}, {'hour_8_9': 'on'}):
+            self.client.post(reverse('schoolweb:manage_availability'), {'day': '2026-11-02', **hours})
+
+        self.assertEqual(Availability.objects.get(user=self.user).hour_list, [8])
+        response = self.client.get(reverse('schoolweb:get_availability', args=['2026-11-02']))
+        self.assertEqual(response.json(), {field: field == 'hour_8_9' for field in Availability.HOUR_FIELDS})
+
+    def test_bulk_saves_week_in_one_statement(self):
+        first_day, _ = availability_window()
+        Availability.save_days(self.user, {first_day: {'hour_6_7': True}})
+        days = {(first_day + timedelta(days=i)).isoformat(): {'hour_17_18': True} for i in range(7)}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('schoolweb:manage_availability_bulk'), {'days': days},
+                                        content_type='application/json')
+
+        self.assertEqual(response.json(), {'saved': 7})
+        self.assertEqual(sum(query['sql'].startswith('INSERT') for query in queries), 1)
+        self.assertEqual(Availability.objects.filter(user=self.user).covering(Availability.slot_mask(17, 18)).count(), 7)
+        self.assertEqual(Availability.objects.get(user=self.user, day=first_day).hour_list, [17])
+
+    def test_bulk_rejects_invalid_payload(self):
+        url = reverse('schoolweb:manage_availability_bulk')
+        first_day, last_day = availability_window()
+        for days in (
+            {'jutro': {}},
+            {first_day.isoformat(): {'hour_1_2': True}},
+            {first_day.isoformat(): {'hour_6_7': 'false'}},
+            {(first_day - timedelta(days=1)).isoformat(): {'hour_6_7': True}},
+            {(last_day + timedelta(days=1)).isoformat(): {'hour_6_7': True}},
+            {},
+            [],
+        ):
+            response = self.client.post(url, {'days': days}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Availability.objects.exists())
+
+
+class AvailabilityMaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = date(2026, 11, 3)
+        cls.evening = User.objects.create_user(username='wieczor', email='wieczor@example.com')
+        cls.partly = User.objects.create_user(username='czesciowo', email='czesciowo@example.com')
+        cls.morning = User.objects.create_user(username='rano', email='rano@example.com')
+        Availability.save_days(cls.evening, {cls.day: {'hour_17_18': True, 'hour_18_19': True, 'hour_19_20': True}})
+        Availability.save_days(cls.partly, {cls.day: {'hour_18_19': True}})
+        Availability.save_days(cls.morning, {cls.day: {'hour_6_7': True}})
+
+    def test_slot_mask(self):
+        self.assertEqual(Availability.slot_mask(6, 7), 1)
+        self.assertEqual(Availability.slot_mask(17, 19), 0b11 << 11)
+        self.assertEqual(Availability.slot_mask(6, 22), (1 << 16) - 1)
+        with self.assertRaises(ValueError):
+            Availability.slot_mask(5, 7)
+        flags = {'hour_17_18': True, 'hour_18_19': True}
+        self.assertEqual(Availability.mask_from_flags(flags), Availability.slot_mask(17, 19))
+        self.assertEqual({f for f, free in Availability.flags_from_mask(Availability.slot_mask(17, 19)).items() if free}, set(flags))
+
+    def test_covering_and_overlapping(self):
+        slot = Availability.slot_mask(17, 19)
+        on_day = Availability.objects.filter(day=self.day)
+        self.assertEqual(set(on_day.covering(slot).values_list('user', flat=True)), {self.evening.id})
+        self.assertEqual(set(on_day.overlapping(slot).values_list('user', flat=True)), {self.evening.id, self.partly.id})
+
+    def test_hour_counts(self):
+        counts = Availability.hour_counts(Availability.objects.values_list('hours', flat=True))
+        self.assertEqual((counts[6], counts[17], counts[18], counts[21]), (1, 1, 2, 0))
+
+
+class MatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.maths, physics = Topic.objects.create(name='Matematyka'), Topic.objects.create(name='Fizyka')
+        teachers = Group.objects.create(name='Teachers')
+        cls.best = User.objects.create_user(username='najlepszy', email='najlepszy@example.com',
+                                            subject=cls.maths, level='Rozszerzenie')
+        cls.basic = User.objects.create_user(username='podstawa', email='podstawa@example.com',
+                                             subject=cls.maths, level='Podstawa')
+        cls.physicist = User.objects.create_user(username='fizyk', email='fizyk@example.com',
+                                                 subject=physics, level='Rozszerzenie')
+        for teacher in (cls.best, cls.basic, cls.physicist):
+            teacher.groups.add(teachers)
+
+        student_user = User.objects.create_user(username='uczen', email='uczen@example.com')
+        cls.student = NewStudents.objects.create(user=student_user, first_name='Jan', last_name='Kowalski',
+                                                 subject=cls.maths, level='Rozszerzenie')
+        cls.today = date(2026, 11, 2)
+        evening = {'hour_17_18': True, 'hour_18_19': True, 'hour_19_20': True, 'hour_20_21': True}
+        Availability.save_days(student_user, {cls.today: evening})
+        Availability.save_days(cls.best, {cls.today: evening})
+        Availability.save_days(cls.basic, {cls.today: {'hour_8_9': True}})
+
+    def test_ranking_uses_subject_level_and_shared_hours(self):
+        students = NewStudents.objects.filter(is_selected=False)
+        with self.assertNumQueries(3):
+            best = suggestions_for_teacher(self.best, students, start=self.today)
+        self.assertEqual([(s.id, s.match_score, s.match_position) for s in best], [(self.student.id, 100, 1)])
+
+        basic = suggestions_for_teacher(self.basic, NewStudents.objects.filter(is_selected=False), start=self.today)
+        self.assertEqual([(s.match_score, s.match_position) for s in basic], [(40, 2)])
+        self.assertEqual(suggestions_for_teacher(self.physicist, students, start=self.today), [])
+
+    def test_new_students_page_lists_suggestions(self):
+        self.client.force_login(self.best)
+        response = self.client.get(reverse('schoolweb:new_students'))
+        self.assertEqual([student.id for student in response.context['suggestions']], [self.student.id])
+
+
+class StudentClaimTests(TransactionTestCase):
+    def setUp(self):
+        self.teachers = [
+            User.objects.create_user(username=f'nauczyciel{i}', email=f'nauczyciel{i}@example.com') for i in range(8)
+        ]
+        self.students = [
+            NewStudents.objects.create(first_name='Uczeń', last_name=str(i), level='Podstawa') for i in range(5)
+        ]
+
+    def test_concurrent_claims_create_one_course_per_student(self):
+        barrier = threading.Barrier(len(self.teachers))
+        won, errors = [], []
+
+        def claim_all(teacher):
+            barrier.wait()
+            try:
+                for student in self.students:
+                    if retry_locked(lambda: claim_student(teacher, NewStudents.objects.get(pk=student.pk))) is not None:
+                        won.append(student.pk)
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim_all, args=[teacher]) for teacher in self.teachers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(won), sorted(student.pk for student in self.students))
+        self.assertEqual(Course.objects.count(), len(self.students))
+        self.assertFalse(NewStudents.objects.filter(is_selected=False).exists())
+
+    def test_claim_is_conditional(self):
+        student = self.students[0]
+        self.assertTrue(NewStudents.claim(student.pk))
+        self.assertFalse(NewStudents.claim(student.pk))
+
+
+class TeacherDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='pulpit', email='pulpit@example.com')
+        cls.teacher.groups.add(Group.objects.create(name='Teachers'))
+        cls.course = Course.objects.create(name='Chemia', teacher=cls.teacher)
+        for i in range(2):
+            cls.course.students.add(User.objects.create_user(username=f'chemik{i}', email=f'chemik{i}@example.com'))
+
+    def add_lesson(self, hours_from_now, feedback_submitted=False):
+        lesson = Lesson.objects.create(host=self.teacher, course=self.course, title='Lekcja',
+                                       event_datetime=datetime.now() + timedelta(hours=hours_from_now),
+                                       feedback_submitted=feedback_submitted)
+        CourseMessage.objects.create(user=self.teacher, room=lesson, body='Komentarz')
+        return lesson
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def dashboard(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schoolweb:teacherPage'))
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_lessons(self):
+        self.add_lesson(2)
+        # Warm-up, so neither measured request pays for one-off middleware work such as a session refresh.
+        self.dashboard()
+        _, queries_for_one = self.dashboard()
+
+        LessonCorrection.objects.create(lesson=self.add_lesson(-2, feedback_submitted=True))
+        self.add_lesson(-3, feedback_submitted=True)
+        self.add_lesson(5)
+        response, queries_for_four = self.dashboard()
+
+        self.assertEqual(queries_for_four, queries_for_one)
+        self.assertContains(response, '1 odpowiedzi', count=4)
+
+    def test_upcoming_first_then_past(self):
+        later, soon, recent, old = self.add_lesson(5), self.add_lesson(2), self.add_lesson(-2), self.add_lesson(-30)
+        LessonCorrection.objects.create(lesson=recent)
+
+        lessons = self.dashboard()[0].context['lessons']
+
+        self.assertEqual([lesson.id for lesson in lessons], [soon.id, later.id, recent.id, old.id])
+        self.assertEqual([lesson.correction_sent for lesson in lessons], [False, False, True, False])
+        self.assertTrue(lessons[0].lock_before_join)
+        self.assertTrue(lessons[3].can_feedback)
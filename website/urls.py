@@ -23,8 +23,10 @@ urlpatterns = [
     path('session-timeout/', views.session_timeout, name='session_timeout'),
     path('rejestracja-strefa-wiedzy/', views.registerPage, name="register"),
     path('strefa-wiedzy/', views.knowledge_zone, name="knowledge_zone"),
+    path('strefa-wiedzy/wiecej/', views.knowledge_zone_more, name="knowledge_zone_more"),
     path('strefa-wiedzy/post/<int:pk>/zgłos/', views.reportRoom, name='report-room'),
     path('strefa-wiedzy/post/<str:pk>/', views.room, name="room"),
+    path('strefa-wiedzy/post/<int:pk>/komentarze/', views.room_comments, name="room-comments"),
     path('strefa-wiedzy/utworz-post/', views.createRoom, name="create-room"),
     path('strefa-wiedzy/edytuj-post/<str:pk>/', views.updateRoom, name="update-room"),
     path('strefa-wiedzy/usun-post/<str:pk>/', views.deleteRoom, name="delete-room"),
@@ -38,6 +40,7 @@ urlpatterns = [
     path('like-room/<int:pk>/', views.like_room, name='like-room'),
     path('toggle-like/<int:message_id>/', views.toggle_like, name='toggle-like'),
     path('get_likes/<int:message_id>/', views.get_likes, name='get_likes'),
+    path('get_likes/', views.get_likes_batch, name='get_likes_batch'),
     path('get_room_likes/<int:room_id>/', views.get_room_likes, name='get_room_likes'),
     path('toggle-like-room/<int:room_id>/', views.toggle_like_room, name='toggle_like_room'),
 
@@ -58,6 +61,7 @@ urlpatterns = [
     path('rezygnacja/', views.resignation, name='resignation'),
 
     path('lekcja/<str:pk>/', views.lesson, name="lesson"),
+    path('lekcja/<int:pk>/komentarze/', views.lesson_comments, name="lesson-comments"),
     path('utworz-lekcje/', views.createLesson, name='create-lesson'),
     path('edytuj-lekcje/<str:pk>/', views.updateLesson, name='update-lesson'),
 
@@ -68,6 +72,7 @@ urlpatterns = [
 
 
     path('dostępność/', views.manage_availability, name='manage_availability'),
+    path('dostępność/zbiorczo/', views.manage_availability_bulk, name='manage_availability_bulk'),
     path('get_availability/<str:selected_date>/', views.get_availability, name='get_availability'),
 
     path('znajdz-korepetycje/', views.findTutor, name='find_tutor'),
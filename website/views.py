@@ -1,9 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, F, Sum
+from django.db.models import Q, F, Sum, Count
 from django.db import transaction
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import authenticate, login, logout, aauthenticate, alogin
+from asgiref.sync import sync_to_async
 from .models import (User, Room, Topic, Message, Course, Lesson, LessonStats, CourseMessage, PlatformMessage, BlogPost,
                      BlogCategory, LessonStats, TeachersEarning, NewStudents)
 from .forms import (RoomForm, UserForm, MyUserCreationForm, LessonFormCreate, LessonFormEdit, LessonFeedbackForm,
@@ -18,84 +19,60 @@ from django.dispatch import receiver
 from datetime import datetime
 from django.utils import timezone
 from datetime import timedelta
-from .forms import AvailabilityForm
+from .forms import AvailabilityForm, availability_window
 from .models import Availability
 from django.core.paginator import Paginator
 from django.contrib.auth.models import Group
 from datetime import date
 from django.core.exceptions import PermissionDenied
 from xhtml2pdf import pisa
-from django.template.loader import get_template
+from django.template.loader import get_template, render_to_string
 from django.contrib.messages import get_messages
 from django.contrib.auth import get_user
 import html
+import json
 from django.views.decorators.http import require_POST
-from django.conf import settings
-import requests
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, Http404
+from .pagination import KeysetPaginator
+from .search import search_rooms, search_blog_posts
+from .caching import get_blog_sidebar
+from . import likes, matching
+from .recaptcha import averify_recaptcha
 
 
 
 '''~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~'''
 
-def get_target_url(user):
-    if user.is_authenticated:
-        group_obj = user.groups.first()
-        if group_obj:
-            group = group_obj.name
-            return {
-                'Teachers': 'schoolweb:teacherPage',
-                'Students': 'schoolweb:studentPage',
-                'NewStudents': 'schoolweb:coursesLoader',
-                'NewTeachers': 'schoolweb:coursesLoader',
-                'Writers': 'schoolweb:WriterToTutoringZone'
-            }.get(group, 'schoolweb:applyUser')
-    return 'schoolweb:applyUser'
-
-
 '''~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~WIDGET~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~'''
 
 
 def home(request):
-    target_url = get_target_url(request.user)
-    return render(request, 'widget/main-view.html', {'target_url': target_url})
+    return render(request, 'widget/main-view.html')
 
 
 def become_tutor(request):
-    target_url = get_target_url(request.user)
-    return render(request, 'widget/become-tutor.html', {'target_url': target_url})
+    return render(request, 'widget/become-tutor.html')
 
 
 def faq(request):
-    target_url = get_target_url(request.user)
-    return render(request, 'widget/faq.html', {'target_url': target_url})
+    return render(request, 'widget/faq.html')
 
 
 def contact(request):
-    target_url = get_target_url(request.user)
-    return render(request, 'widget/contact.html', {'target_url': target_url})
+    return render(request, 'widget/contact.html')
 
 
 def subjects(request):
-    target_url = get_target_url(request.user)
-    return render(request, 'widget/subjects.html', {'target_url': target_url})
+    return render(request, 'widget/subjects.html')
 
 
-def verify_recaptcha(token):
-    secret_key = settings.RECAPTCHA_SECRET_KEY
-    response = requests.post(
-        'https://www.google.com/recaptcha/api/siteverify',
-        data={
-            'secret': secret_key,
-            'response': token
-        }
-    )
-    result = response.json()
-    return result.get('success', False)
+async def arender(request, template_name, context=None):
+    """render() for async views; templates and context processors may touch request.user and the session."""
+    return await sync_to_async(render)(request, template_name, context)
 
 
 @require_POST
-def user_message(request):
+async def user_message(request):
     email = request.POST.get('email', '').strip()
     phone_number = request.POST.get('phone_number', '').strip()
     message = request.POST.get('message', '').strip()
@@ -107,7 +84,7 @@ def user_message(request):
     if '@' not in email:
         return JsonResponse({'status': 'error', 'message': 'Nieprawidłowy adres email.'}, status=400)
 
-    if not recaptcha_token or not verify_recaptcha(recaptcha_token):
+    if not recaptcha_token or not await averify_recaptcha(recaptcha_token):
         return JsonResponse({'status': 'error', 'message': 'Weryfikacja reCAPTCHA nie powiodła się.'}, status=400)
 
     email = html.escape(email)
@@ -115,7 +92,7 @@ def user_message(request):
     message = html.escape(message)
 
     try:
-        PlatformMessage.objects.create(
+        await PlatformMessage.objects.acreate(
             email=email,
             phone_number=phone_number,
             message=message
@@ -133,17 +110,64 @@ def user_message(request):
 
 
 def get_blog_context():
-    categories = BlogCategory.objects.all()
-    years = BlogPost.objects.dates('created_at', 'year').distinct()
-    months = BlogPost.objects.dates('created_at', 'month').distinct()
-    days = BlogPost.objects.dates('created_at', 'day').distinct()
-
-    return {
-        'categories': categories,
-        'years': years,
-        'months': months,
-        'days': days,
-    }
+    return dict(get_blog_sidebar())
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _day_range(year, month, day):
+    try:
+        start = datetime(year, month, day)
+    except ValueError:
+        return None
+    return start, start + timedelta(days=1)
+
+
+def _month_range(year, month):
+    start = datetime(year, month, 1)
+    return start, datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def archive_filter(year, month, day):
+    """
+    Archive year/month/day filter as half-open `created_at` ranges, so the index on created_at is used
+    instead of evaluating date functions on every row.
+
+    The selects in the sidebar are independent; a month or day without a year is expanded to one range
+    per year (month) present in the archive.
+    """
+    year, month, day = _to_int(year), _to_int(month), _to_int(day)
+    if (year is not None and not 1 <= year < 9999) or (month is not None and not 1 <= month <= 12):
+        return Q(pk__in=[])
+
+    if year is not None:
+        years = [year]
+    else:
+        years = [d.year for d in get_blog_sidebar()['years']]
+
+    if month is not None:
+        months = [(y, month) for y in years]
+    elif day is not None:
+        months = [(d.year, d.month) for d in get_blog_sidebar()['months'] if d.year in years]
+    else:
+        months = None
+
+    if months is None:
+        ranges = [(datetime(y, 1, 1), datetime(y + 1, 1, 1)) for y in years]
+    elif day is None:
+        ranges = [_month_range(y, m) for y, m in months]
+    else:
+        ranges = [r for r in (_day_range(y, m, day) for y, m in months) if r]
+
+    condition = Q(pk__in=[])
+    for start, end in ranges:
+        condition |= Q(created_at__gte=start, created_at__lt=end)
+    return condition
 
 
 def blog_post_list(request):
@@ -155,23 +179,17 @@ def blog_post_list(request):
     new = request.GET.get('new')
     trending = request.GET.get('trending')
 
-    blog_posts = BlogPost.objects.all()
+    blog_posts = BlogPost.objects.select_related('category', 'author')
 
     if category_id:
         category = get_object_or_404(BlogCategory, id=category_id)
         blog_posts = blog_posts.filter(category=category)
 
     if query:
-        blog_posts = blog_posts.filter(Q(title__icontains=query))
-
-    if year:
-        blog_posts = blog_posts.filter(created_at__year=year)
-
-    if month:
-        blog_posts = blog_posts.filter(created_at__month=month)
+        blog_posts = search_blog_posts(blog_posts, query)
 
-    if day:
-        blog_posts = blog_posts.filter(created_at__day=day)
+    if year or month or day:
+        blog_posts = blog_posts.filter(archive_filter(year, month, day))
 
     if new:
         blog_posts = blog_posts.filter(is_new=True)
@@ -179,7 +197,10 @@ def blog_post_list(request):
     if trending:
         blog_posts = blog_posts.filter(is_trending=True)
 
-    blog_posts = blog_posts.order_by('-created_at')
+    if query:
+        blog_posts = blog_posts.order_by('-search_rank', '-created_at')
+    else:
+        blog_posts = blog_posts.order_by('-created_at')
 
     page = request.GET.get('page', 1)
     paginator = Paginator(blog_posts, 12)
@@ -214,21 +235,21 @@ def blog_post_detail(request, slug, id):
 
 
 def like_post(request, pk):
-    post = get_object_or_404(BlogPost, pk=pk)
     liked_posts = request.COOKIES.get('liked_posts', '')
     liked_posts_list = liked_posts.split(',')
 
     if str(pk) in liked_posts_list:
         liked_posts_list.remove(str(pk))
-        post.likes -= 1
         liked = False
     else:
         liked_posts_list.append(str(pk))
-        post.likes += 1
         liked = True
 
-    post.save()
-    response = JsonResponse({'likes': post.likes, 'liked': liked})
+    likes = BlogPost.change_likes(pk, 1 if liked else -1)
+    if likes is None:
+        likes = get_object_or_404(BlogPost, pk=pk).likes
+
+    response = JsonResponse({'likes': likes, 'liked': liked})
     response.set_cookie('liked_posts', ','.join(liked_posts_list))
     return response
 
@@ -236,14 +257,14 @@ def like_post(request, pk):
 '''~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~KNOWLEDGE-ZONE~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~'''
 
 
-def loginPage(request):
+async def loginPage(request):
     messages.get_messages(request)
 
     if request.method == 'POST':
         recaptcha_token = request.POST.get('g-recaptcha-response')
-        if not recaptcha_token or not verify_recaptcha(recaptcha_token):
+        if not recaptcha_token or not await averify_recaptcha(recaptcha_token):
             messages.error(request, 'Weryfikacja reCAPTCHA nie powiodła się. Spróbuj ponownie.')
-            return render(request, 'knowledge-zone/login_register.html', {'page': 'login'})
+            return await arender(request, 'knowledge-zone/login_register.html', {'page': 'login'})
 
         email = request.POST.get('email', '').lower()
         password = request.POST.get('password', '')
@@ -253,15 +274,15 @@ def loginPage(request):
         except NoReverseMatch:
             next_url = reverse('home')
 
-        user = authenticate(request, username=email, password=password)
+        user = await aauthenticate(request, username=email, password=password)
 
         if user is not None:
-            login(request, user)
+            await alogin(request, user)
             return redirect(next_url)
         else:
             messages.error(request, 'Błędny Email lub Hasło')
 
-    return render(request, 'knowledge-zone/login_register.html', {'page': 'login'})
+    return await arender(request, 'knowledge-zone/login_register.html', {'page': 'login'})
 
 
 @login_required(login_url='schoolweb:login')
@@ -277,15 +298,20 @@ def session_timeout(request):
     return redirect('schoolweb:login')
 
 
-def registerPage(request):
+async def registerPage(request):
     messages.get_messages(request)
 
     if request.method == 'POST':
         recaptcha_token = request.POST.get('g-recaptcha-response')
-        if not recaptcha_token or not verify_recaptcha(recaptcha_token):
+        if not recaptcha_token or not await averify_recaptcha(recaptcha_token):
             messages.error(request, 'Weryfikacja reCAPTCHA nie powiodła się. Spróbuj ponownie.')
             return redirect('schoolweb:register')
 
+    return await sync_to_async(register_user)(request)
+
+
+def register_user(request):
+    if request.method == 'POST':
         if not request.POST.get('accept_terms'):
             messages.error(request, 'Musisz zaakceptować regulamin i politykę prywatności.')
             return redirect('schoolweb:register')
@@ -319,48 +345,40 @@ def registerPage(request):
     return render(request, 'knowledge-zone/login_register.html', {'form': form, 'page': 'register'})
 
 
-def knowledge_zone(request):
-    q = request.GET.get('q', '').strip()
-    level_filter = request.GET.get('level', '').strip()
+FEED_PAGE_SIZE = 10
+
 
-    rooms = Room.objects.all()
+def get_feed_rooms(q, level_filter):
+    rooms = Room.objects.feed()
+    ordering = ('-created', '-id')
 
     if q:
-        rooms = rooms.filter(
-            Q(topic__name__icontains=q) |
-            Q(name__icontains=q) |
-            Q(description__icontains=q)
-        )
+        rooms = search_rooms(rooms, q)
+        ordering = ('-search_rank', '-id')
 
     if level_filter:
         rooms = rooms.filter(level=level_filter)
 
-    topics = Topic.objects.all()[:30]
-    room_count = rooms.count()
-    room_messages = Message.objects.order_by('-created')[:12]
+    return rooms, ordering
 
-    if request.user.is_authenticated:
-        if request.user.groups.filter(name='NewTeachers').exists() or request.user.groups.filter(name='NewStudents').exists():
-            user_redirect_url = reverse('schoolweb:coursesLoader')
-        elif request.user.groups.filter(name='Teachers').exists():
-            user_redirect_url = reverse('schoolweb:teacherPage')
-        elif request.user.groups.filter(name='Students').exists():
-            user_redirect_url = reverse('schoolweb:studentPage')
-        elif request.user.groups.filter(name='Writers').exists():
-            user_redirect_url = reverse('schoolweb:WriterToTutoringZone')
-        else:
-            user_redirect_url = reverse('schoolweb:applyUser')
-    else:
-        user_redirect_url = reverse('schoolweb:applyUser')
 
-    print(user_redirect_url)
+def knowledge_zone(request):
+    q = request.GET.get('q', '').strip()
+    level_filter = request.GET.get('level', '').strip()
+
+    rooms, ordering = get_feed_rooms(q, level_filter)
+    feed_page = KeysetPaginator(rooms, FEED_PAGE_SIZE, ordering).get_page()
+
+    topics = Topic.objects.all()[:30]
+    room_count = rooms.count()
+    room_messages = Message.objects.select_related('user', 'room').order_by('-created')[:12]
 
     context = {
-        'rooms': rooms,
+        'rooms': feed_page,
+        'next_cursor': feed_page.next_cursor,
         'topics': topics,
         'room_count': room_count,
         'room_messages': room_messages,
-        'user_redirect_url': user_redirect_url,
         'current_q': q,
         'current_level': level_filter,
     }
@@ -368,10 +386,61 @@ def knowledge_zone(request):
     return render(request, 'knowledge-zone/knowledge-zone.html', context)
 
 
+def knowledge_zone_more(request):
+    q = request.GET.get('q', '').strip()
+    level_filter = request.GET.get('level', '').strip()
+
+    rooms, ordering = get_feed_rooms(q, level_filter)
+    feed_page = KeysetPaginator(rooms, FEED_PAGE_SIZE, ordering).get_page(request.GET.get('cursor'))
+
+    html = render_to_string('knowledge-zone/feed-knowledge-zone.html', {'rooms': feed_page}, request=request)
+
+    return JsonResponse({
+        'html': html,
+        'next_cursor': feed_page.next_cursor,
+        'has_next': feed_page.has_next,
+    })
+
+
+COMMENTS_PAGE_SIZE = 20
+
+
+def paginate_comments(comments, created_field, cursor=None, newer=False):
+    """
+    Keyset page of a comment thread: the comments older than `cursor` (newest first), or with
+    `newer=True` the ones posted after it (oldest first). A missing cursor gives the newest comments.
+    """
+    ordering = (created_field, 'id') if newer else (f'-{created_field}', '-id')
+    paginator = KeysetPaginator(comments, COMMENTS_PAGE_SIZE, ordering)
+    return paginator, paginator.get_page(cursor)
+
+
+def comments_more(request, comments, created_field, template, context_name, oldest_first):
+    """JSON fragment with the next page of a thread for `?cursor=...&direction=older|newer`."""
+    cursor = request.GET.get('cursor')
+    newer = request.GET.get('direction') == 'newer'
+    paginator, page = paginate_comments(comments, created_field, cursor, newer)
+
+    object_list = page.object_list[::-1] if newer != oldest_first else page.object_list
+    next_cursor = page.next_cursor
+    if newer and next_cursor is None:
+        # Keep the position of the newest comment so the client can check again later.
+        next_cursor = paginator.encode_cursor(page.object_list[-1]) if page.object_list else cursor
+
+    html = render_to_string(template, {context_name: object_list}, request=request)
+
+    return JsonResponse({
+        'html': html,
+        'next_cursor': next_cursor,
+        'has_next': page.has_next,
+    })
+
+
 def room(request, pk):
-    room = get_object_or_404(Room, pk=pk)
-    room_messages = room.message_set.select_related('user').all().order_by('created')
-    participants = room.participants.all()
+    room = get_object_or_404(Room.objects.select_related('host', 'topic').with_liked_by(request.user), pk=pk)
+    paginator, comments_page = paginate_comments(Message.objects.filter(room=room).thread(request.user), 'created')
+    room_messages = comments_page.object_list[::-1]
+    participants = room.participants.only('id', 'first_name', 'username', 'avatar')
 
     similar_rooms = Room.objects.filter(
         topic=room.topic,
@@ -395,23 +464,23 @@ def room(request, pk):
             messages.success(request, 'Komentarz został dodany pomyślnie!')
             return redirect('schoolweb:room', pk=room.id)
 
-    if request.user.groups.filter(name='Teachers').exists():
-        user_redirect_url = reverse('schoolweb:teacherPage')
-    elif request.user.groups.filter(name='Students').exists():
-        user_redirect_url = reverse('schoolweb:studentPage')
-    else:
-        user_redirect_url = reverse('schoolweb:applyUser')
-
     context = {
         'room': room,
         'room_messages': room_messages,
+        'older_cursor': comments_page.next_cursor,
+        'newer_cursor': paginator.encode_cursor(room_messages[-1]) if room_messages else None,
         'participants': participants,
-        'user_redirect_url': user_redirect_url,
         'similar_rooms': similar_rooms,
     }
     return render(request, 'knowledge-zone/room.html', context)
 
 
+def room_comments(request, pk):
+    room = get_object_or_404(Room.objects.only('id'), pk=pk)
+    comments = Message.objects.filter(room=room).thread(request.user)
+    return comments_more(request, comments, 'created', 'knowledge-zone/room-comments.html', 'room_messages', True)
+
+
 @login_required(login_url='schoolweb:login')
 @transaction.atomic
 def createRoom(request):
@@ -608,10 +677,10 @@ def userProfile(request, pk):
     user = get_object_or_404(User, id=pk)
     logged_in_user = request.user
 
-    rooms = user.hosted_rooms.all()
-    room_messages = user.messages.all()
+    rooms = user.hosted_rooms.feed()
+    room_messages = user.messages.select_related('user', 'room')
     topics = Topic.objects.all()
-    user_posts = user.hosted_rooms.all()
+    user_posts = rooms
     lessons = user.lesson_set.all()
     lesson_messages = user.coursemessage_set.all()
 
@@ -634,21 +703,15 @@ def userProfile(request, pk):
         lesson_stats.all_referral_bonus
     )
 
-    is_teacher = logged_in_user.groups.filter(name='Teachers').exists()
-    is_student = logged_in_user.groups.filter(name='Students').exists()
+    is_teacher = 'Teachers' in request.user_roles
+    is_student = 'Students' in request.user_roles
 
     if is_teacher:
-        navbar_template = 'tutoring-zone/nav-teacher-view.html'
         courses_component = 'tutoring-zone/courses-component-teachers.html'
-        user_redirect_url = reverse('schoolweb:teacherPage')
     elif is_student:
-        navbar_template = 'tutoring-zone/nav-student-view.html'
         courses_component = 'tutoring-zone/courses-component-students.html'
-        user_redirect_url = reverse('schoolweb:studentPage')
     else:
-        navbar_template = 'knowledge-zone/nav-no-search.html'
         courses_component = ''
-        user_redirect_url = reverse('schoolweb:WriterToTutoringZone')
 
     if logged_in_user == user:
         profile_user_courses = Course.objects.filter(teacher=user) | Course.objects.filter(students=user)
@@ -689,7 +752,6 @@ def userProfile(request, pk):
         'package': lesson_stats.lessons,
         'all_package': lesson_stats.all_lessons,
         'courses': profile_user_courses,
-        'navbar_template': navbar_template,
         'courses_component': courses_component,
         'is_teacher': is_teacher,
         'is_student': is_student,
@@ -697,8 +759,9 @@ def userProfile(request, pk):
         'all_earnings': all_earnings,
         'teacher_data': teacher_data,
         'is_course_teacher_of_user': is_course_teacher_of_user,
-        'user_redirect_url': user_redirect_url,
     }
+    if not is_teacher and not is_student:
+        context['navbar_template'] = 'knowledge-zone/nav-no-search.html'
 
     return render(request, 'knowledge-zone/profile.html', context)
 
@@ -745,108 +808,74 @@ def topicsPage(request):
     q = request.GET.get('q', '')
     topics = Topic.objects.filter(Q(name__icontains=q))
 
-    if request.user.is_authenticated:
-        if request.user.groups.filter(name='NewTeachers').exists() or request.user.groups.filter(name='NewStudents').exists():
-            user_redirect_url = reverse('schoolweb:coursesLoader')
-        elif request.user.groups.filter(name='Teachers').exists():
-            user_redirect_url = reverse('schoolweb:teacherPage')
-        elif request.user.groups.filter(name='Students').exists():
-            user_redirect_url = reverse('schoolweb:studentPage')
-        elif request.user.groups.filter(name='Writers').exists():
-            user_redirect_url = reverse('schoolweb:WriterToTutoringZone')
-        else:
-            user_redirect_url = reverse('schoolweb:applyUser')
-    else:
-        user_redirect_url = reverse('schoolweb:applyUser')
-
-    return render(request, 'knowledge-zone/topics.html', {
-        'topics': topics,
-        'user_redirect_url': user_redirect_url
-    })
+    return render(request, 'knowledge-zone/topics.html', {'topics': topics})
 
 
 def like_room(request, pk):
-    room = get_object_or_404(Room, pk=pk)
-
     if request.user.is_authenticated:
-        if request.user in room.likes.all():
-            room.likes.remove(request.user)
-        else:
-            room.likes.add(request.user)
+        try:
+            likes.toggle_like(Room, pk, request.user)
+        except Room.DoesNotExist:
+            raise Http404
+    else:
+        get_object_or_404(Room, pk=pk)
 
-    return redirect('room', pk=room.id)
+    return redirect('room', pk=pk)
 
 
 def toggle_like(request, message_id):
     if request.method == 'POST' and request.user.is_authenticated:
-        message = Message.objects.get(pk=message_id)
+        message = get_object_or_404(Message, pk=message_id)
         message.toggle_like(request.user)
-        likes_count = message.likes.count()
-        return JsonResponse({'likes_count': likes_count})
+        return JsonResponse({'likes_count': message.likes_count})
     else:
         return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
 def toggle_like_room(request, room_id):
-    room = get_object_or_404(Room, id=room_id)
-    user = request.user
-
-    if user in room.likes.all():
-        room.likes.remove(user)
-        liked = False
-    else:
-        room.likes.add(user)
-        liked = True
-
-    return JsonResponse({'liked': liked, 'likes_count': room.likes.count()})
-
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
 
-def get_room_likes(request, room_id):
-    room = get_object_or_404(Room, id=room_id)
-    liked_users = room.likes.all()
+    try:
+        liked, likes_count = likes.toggle_like(Room, room_id, request.user)
+    except Room.DoesNotExist:
+        raise Http404
+    return JsonResponse({'liked': liked, 'likes_count': likes_count})
 
-    liked_users_data = []
-    for user in liked_users:
-        if user.avatar and hasattr(user.avatar, 'url'):
-            avatar_url = user.avatar.url
-        else:
-            avatar_url = '/static/img/profile-pictures/avatar.svg'
 
-        liked_users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'avatar': avatar_url,
-        })
+MAX_LIKES_BATCH = 100
 
-    return JsonResponse({'liked_users': liked_users_data})
 
+def get_room_likes(request, room_id):
+    get_object_or_404(Room.objects.only('id'), id=room_id)
+    page = likes.likers_paginator(Room, room_id).get_page(request.GET.get('cursor'))
+    return JsonResponse(likes.serialize_likers_page(page))
 
 
 def get_likes(request, message_id):
-    message = get_object_or_404(Message, id=message_id)
-    liked_users = message.likes.all()
+    get_object_or_404(Message.objects.only('id'), id=message_id)
+    page = likes.likers_paginator(Message, message_id).get_page(request.GET.get('cursor'))
+    return JsonResponse(likes.serialize_likers_page(page))
 
-    liked_users_data = []
-    for user in liked_users:
-        if user.avatar and hasattr(user.avatar, 'url'):
-            avatar_url = user.avatar.url
-        else:
-            avatar_url = '/static/img/profile-pictures/avatar.svg'
 
-        liked_users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'avatar': avatar_url,
-        })
+def get_likes_batch(request):
+    """First page of likers for every comment in `?ids=1,2,3`, so a room page hydrates them in one request."""
+    try:
+        message_ids = list(dict.fromkeys(int(pk) for pk in request.GET.get('ids', '').split(',') if pk))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if len(message_ids) > MAX_LIKES_BATCH:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
 
-    return JsonResponse({'liked_users': liked_users_data})
+    pages = likes.liker_summaries(Message, message_ids)
+    return JsonResponse({'likes': {pk: likes.serialize_likers_page(page) for pk, page in pages.items()}})
 
 
 '''~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~TUTORING-ZONE~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~'''
 
 @login_required(login_url='schoolweb:login')
 def WriterToTutoringZone(request):
-    if not request.user.groups.filter(name='Writers').exists():
+    if 'Writers' not in request.user_roles:
         return redirect('schoolweb:knowledge_zone')
 
     if request.method == 'POST':
@@ -862,14 +891,14 @@ def WriterToTutoringZone(request):
 
                 if referred_user:
                     if user_type in ['student', 'teacher']:
-                        if referred_user.groups.filter(name="Teachers").exists():
+                        if 'Teachers' in referred_user.roles:
                             user.referred_by = referral_code_input
                             lesson_stats, created = LessonStats.objects.get_or_create(user=referred_user)
                             lesson_stats.month_referral_bonus += 50
                             lesson_stats.all_referral_bonus += 50
                             lesson_stats.save()
 
-                        elif referred_user.groups.filter(name="Students").exists():
+                        elif 'Students' in referred_user.roles:
                             user.referred_by = referral_code_input
                             lesson_stats, created = LessonStats.objects.get_or_create(user=referred_user)
 
@@ -910,7 +939,7 @@ def WriterToTutoringZone(request):
             elif user_type == 'student':
                 new_group = Group.objects.get(name='NewStudents')
 
-            if new_group and not request.user.groups.filter(id=new_group.id).exists():
+            if new_group and new_group.name not in request.user_roles:
                 request.user.groups.clear()
                 request.user.groups.add(new_group)
 
@@ -923,14 +952,23 @@ def WriterToTutoringZone(request):
     return render(request, 'tutoring-zone/writer-to-tutoring-zone.html', {'form': form})
 
 
-def applyUser(request):
+async def applyUser(request):
     if request.method == 'POST':
         recaptcha_token = request.POST.get('g-recaptcha-response')
-        if not recaptcha_token or not verify_recaptcha(recaptcha_token):
-            form = ApplyUserForm(request.POST)
-            form.add_error(None, 'Weryfikacja reCAPTCHA nie powiodła się. Spróbuj ponownie.')
-            return render(request, 'tutoring-zone/application-tutoring-zone.html', {'form': form})
+        if not recaptcha_token or not await averify_recaptcha(recaptcha_token):
+            return await sync_to_async(reject_application)(request)
+
+    return await sync_to_async(apply_user)(request)
 
+
+def reject_application(request):
+    form = ApplyUserForm(request.POST)
+    form.add_error(None, 'Weryfikacja reCAPTCHA nie powiodła się. Spróbuj ponownie.')
+    return render(request, 'tutoring-zone/application-tutoring-zone.html', {'form': form})
+
+
+def apply_user(request):
+    if request.method == 'POST':
         form = ApplyUserForm(request.POST)
 
         if form.is_valid():
@@ -953,14 +991,14 @@ def applyUser(request):
 
                 if referred_user:
                     if role in ['student', 'teacher']:
-                        if referred_user.groups.filter(name="Teachers").exists():
+                        if 'Teachers' in referred_user.roles:
                             user.referred_by = referral_code_input
                             lesson_stats, created = LessonStats.objects.get_or_create(user=referred_user)
                             lesson_stats.month_referral_bonus += 50
                             lesson_stats.all_referral_bonus += 50
                             lesson_stats.save()
 
-                        elif referred_user.groups.filter(name="Students").exists():
+                        elif 'Students' in referred_user.roles:
                             user.referred_by = referral_code_input
                             lesson_stats, created = LessonStats.objects.get_or_create(user=referred_user)
 
@@ -1025,7 +1063,7 @@ def applyUser(request):
 
 @login_required(login_url='schoolweb:knowledge_zone')
 def coursesLoader(request):
-    user_groups = set(request.user.groups.values_list('name', flat=True))
+    user_groups = request.user_roles
 
     if 'Teachers' in user_groups:
         return redirect('schoolweb:teacherPage')
@@ -1038,9 +1076,30 @@ def coursesLoader(request):
 
 '''~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ '''
 
+def claim_student(teacher, student):
+    """Create the student's course for `teacher`, or return None when another teacher claimed them first."""
+    with transaction.atomic():
+        if not NewStudents.claim(student.pk):
+            return None
+
+        course_type = 'basic' if student.level == 'Podstawa' else 'intermediate'
+
+        new_course = Course.objects.create(
+            name=f"{student.first_name} {student.last_name}",
+            subject=student.subject,
+            teacher=teacher,
+            course_type=course_type,
+        )
+
+        if student.user:
+            new_course.students.add(student.user)
+
+    return new_course
+
+
 @login_required(login_url='schoolweb:login')
 def newStudent(request):
-    if not request.user.groups.filter(name='Teachers').exists():
+    if 'Teachers' not in request.user_roles:
         return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
 
     if request.method == 'POST':
@@ -1050,36 +1109,19 @@ def newStudent(request):
 
         student = get_object_or_404(NewStudents, id=student_id)
 
-        if student.is_selected:
+        if claim_student(request.user, student) is None:
             messages.error(request, "Ten uczeń został już wybrany przez innego nauczyciela.")
-            return redirect('schoolweb:new_students')
-
-        with transaction.atomic():
-            student.is_selected = True
-            student.save()
-
-            teacher = request.user
-            course_type = 'basic' if student.level == 'Podstawa' else 'intermediate'
-
-            new_course = Course.objects.create(
-                name=f"{student.first_name} {student.last_name}",
-                subject=student.subject,
-                teacher=teacher,
-                course_type=course_type,
-            )
-
-            if student.user:
-                new_course.students.add(student.user)
 
         return redirect('schoolweb:new_students')
 
-    students = NewStudents.objects.filter(is_selected=False)
-    context = {'students': students}
+    students = NewStudents.objects.filter(is_selected=False).select_related('user', 'subject')
+    suggestions = matching.suggestions_for_teacher(request.user, students)
+    context = {'students': students, 'suggestions': suggestions}
     return render(request, 'tutoring-zone/students-list.html', context)
 
 
 def is_teacher(user):
-    return user.groups.filter(name='Teachers').exists()
+    return user.is_authenticated and 'Teachers' in user.roles
 
 
 @login_required(login_url='schoolweb:login')
@@ -1091,31 +1133,25 @@ def teacherPage(request):
     q = request.GET.get('q') if request.GET.get('q') is not None else ''
     teacher = request.user
 
-    courses = Course.objects.filter(teacher=teacher)
-    all_courses = Course.objects.all()
-
-    upcoming_lessons = Lesson.objects.filter(
-        Q(event_datetime__gt=now) &
-        (Q(course__name=q) | Q(title__icontains=q)) &
-        Q(host=teacher)
-    ).order_by('event_datetime')
+    courses = (
+        Course.objects.filter(teacher=teacher)
+        .select_related('subject')
+        .prefetch_related('students')
+        .annotate(lesson_count=Count('lesson'))
+    )
 
-    past_lessons = Lesson.objects.filter(
-        Q(event_datetime__lte=now) &
+    lessons = list(Lesson.objects.filter(
         (Q(course__name=q) | Q(title__icontains=q)) &
         Q(host=teacher)
-    ).order_by('-event_datetime')
-
-    lessons = list(upcoming_lessons) + list(past_lessons)
+    ).dashboard(now))
 
     for lesson in lessons:
-        event = lesson.event_datetime
         feedback_sent = lesson.feedback_submitted
-        correction_sent = lesson.lessoncorrection_set.exists()
+        correction_sent = lesson.correction_sent
 
         # Przedziały czasowe względem teraz
-        time_until = (event - now).total_seconds()
-        time_since = (now - event).total_seconds()
+        time_until = (lesson.event_datetime - now).total_seconds()
+        time_since = -time_until
 
         # Czasowe flagi do użycia w HTML
         lesson.lock_before_join = time_until > 15 * 60  # przed 15 min przed
@@ -1124,35 +1160,25 @@ def teacherPage(request):
         lesson.can_feedback = time_since >= 50 * 60 and not feedback_sent
         lesson.can_refresh = time_since >= 50 * 60 and feedback_sent and not correction_sent
         lesson.lock_only = time_since >= 50 * 60 and feedback_sent and correction_sent  # po 50 min i wszystko już wysłane
-        print(lesson.id, feedback_sent, correction_sent, lesson.can_feedback, lesson.can_refresh, lesson.lock_only)
 
     post_count = len(lessons)
-    lesson_messages = CourseMessage.objects.filter(room__in=lessons)
-
-    if request.user.groups.filter(name='Teachers').exists():
-        user_redirect_url = reverse('schoolweb:teacherPage')
-    elif request.user.groups.filter(name='Students').exists():
-        user_redirect_url = reverse('schoolweb:studentPage')
-    else:
-        user_redirect_url = reverse('schoolweb:login')
+    lesson_messages = CourseMessage.objects.filter(room__in=lessons).select_related('user', 'room')
 
     context = {
         'lessons': lessons,
         'courses': courses,
         'post_count': post_count,
         'lesson_messages': lesson_messages,
-        'all_courses': all_courses,
         'now': now,
         'time_threshold': now,
         'teacher': teacher,
-        'user_redirect_url': user_redirect_url,
     }
 
     return render(request, 'tutoring-zone/teacher-view.html', context)
 
 
 def is_student(user):
-    return user.groups.filter(name='Students').exists()
+    return user.is_authenticated and 'Students' in user.roles
 
 
 @login_required(login_url='schoolweb:login')
@@ -1191,11 +1217,6 @@ def studentPage(request):
     lesson_messages = CourseMessage.objects.filter(Q(room__in=lessons))
     new_student = NewStudents.objects.filter(email=student.email).first()
 
-    if request.user.groups.filter(name='Teachers').exists():
-        user_redirect_url = reverse('schoolweb:teacherPage')
-    elif request.user.groups.filter(name='Students').exists():
-        user_redirect_url = reverse('schoolweb:studentPage')
-
     context = {
         'lessons': lessons,
         'courses': courses,
@@ -1206,7 +1227,6 @@ def studentPage(request):
         'time_threshold': now,
         'teachers': teachers,
         'new_student': new_student,
-        'user_redirect_url': user_redirect_url,
     }
     return render(request, 'tutoring-zone/student-view.html', context)
 
@@ -1216,26 +1236,18 @@ def coursesTutoringZone(request):
     user = request.user
     q = request.GET.get('q', '')
 
-    if user.groups.filter(name='Teachers').exists():
+    if 'Teachers' in request.user_roles:
         courses = Course.objects.filter(name__icontains=q, teacher=user)
-        navbar_template = 'tutoring-zone/nav-teacher-view.html'
-        user_redirect_url = reverse('schoolweb:teacherPage')
         user_group = 'teacher'
-    elif user.groups.filter(name='Students').exists():
+    elif 'Students' in request.user_roles:
         courses = Course.objects.filter(name__icontains=q, students=user)
-        navbar_template = 'tutoring-zone/nav-student-view.html'
-        user_redirect_url = reverse('schoolweb:studentPage')
         user_group = 'student'
     else:
         courses = Course.objects.none()
-        navbar_template = 'tutoring-zone/nav-no-search.html'
-        user_redirect_url = request.META.get('HTTP_REFERER', reverse('schoolweb:applyUser'))
         user_group = None
 
     return render(request, 'tutoring-zone/courses-tutoring-zone.html', {
         'courses': courses,
-        'navbar_template': navbar_template,
-        'user_redirect_url': user_redirect_url,
         'show_search': False,
         'user_group': user_group,
     })
@@ -1245,28 +1257,15 @@ def coursesTutoringZone(request):
 def activityTutoringZone(request):
     lesson_messages = CourseMessage.objects.all()[:12]
 
-    user_redirect_url = request.META.get('HTTP_REFERER', reverse('schoolweb:applyUser'))
-
-    if request.user.groups.filter(name='Teachers').exists():
-        user_redirect_url = reverse('schoolweb:teacherPage')
-        navbar_template = 'tutoring-zone/nav-teacher-view.html'
-    elif request.user.groups.filter(name='Students').exists():
-        user_redirect_url = reverse('schoolweb:studentPage')
-        navbar_template = 'tutoring-zone/nav-student-view.html'
-    else:
-        navbar_template = 'tutoring-zone/nav-no-search.html'
-
     return render(request, 'tutoring-zone/activity-tutoring-zone.html', {
         'lesson_messages': lesson_messages,
-        'user_redirect_url': user_redirect_url,
         'show_search': False,
-        'navbar_template': navbar_template,
     })
 
 
 @login_required(login_url='schoolweb:login')
 def Teachersearnings(request):
-    if not request.user.groups.filter(name='Teachers').exists():
+    if 'Teachers' not in request.user_roles:
         return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
 
     user_earnings = TeachersEarning.objects.filter(user=request.user).order_by('-year', '-month')
@@ -1282,13 +1281,18 @@ def Teachersearnings(request):
 
 @login_required(login_url='schoolweb:login')
 def generate_pdf(request, month, year):
-    if not request.user.groups.filter(name='Teachers').exists():
+    if 'Teachers' not in request.user_roles:
         return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
 
+    if not 1 <= month <= 12:
+        raise Http404
+
+    # A plain range (instead of __month/__year) lets the (host, event_datetime) index do the work.
+    month_start, next_month = _month_range(year, month)
     lessons = Lesson.objects.filter(
         host=request.user,
-        event_datetime__month=month,
-        event_datetime__year=year
+        event_datetime__gte=month_start,
+        event_datetime__lt=next_month,
     )
 
     aggregate_earnings = lessons.aggregate(total_payment=Sum('payment'))['total_payment'] or 0
@@ -1325,8 +1329,7 @@ def generate_pdf(request, month, year):
 
 @login_required(login_url='schoolweb:login')
 def resignation(request):
-    user = request.user
-    is_teacher = user.groups.filter(name='Teachers').exists()
+    is_teacher = 'Teachers' in request.user_roles
 
     if request.method == 'POST':
         form = ResignationForm(request.POST, is_teacher=is_teacher)
@@ -1354,16 +1357,17 @@ def resignation(request):
     })
 
 
+def is_lesson_member(user, lesson):
+    """The course teacher or one of its students; a lesson whose course was deleted has no members."""
+    course = lesson.course
+    return course is not None and (user == course.teacher or course.students.filter(pk=user.pk).exists())
+
+
 @login_required(login_url='schoolweb:login')
 def lesson(request, pk):
-    lesson = get_object_or_404(Lesson, id=pk)
-    lesson_messages = lesson.coursemessage_set.order_by('-messageCreated')
-    participants = lesson.participants.all()
-
-    user = request.user
-    course = lesson.course
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), id=pk)
 
-    if user != course.teacher and user not in course.students.all():
+    if not is_lesson_member(request.user, lesson):
         return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
 
     if request.method == 'POST':
@@ -1380,29 +1384,35 @@ def lesson(request, pk):
         message.save()
         return redirect('schoolweb:lesson', pk=lesson.id)
 
-    navbar_template = ''
-    back_link = ''
-
-    if user.groups.filter(name='Teachers').exists():
-        navbar_template = 'tutoring-zone/nav-teacher-view.html'
-        back_link = reverse('schoolweb:teacherPage')
-    elif user.groups.filter(name='Students').exists():
-        navbar_template = 'tutoring-zone/nav-student-view.html'
-        back_link = reverse('schoolweb:studentPage')
+    comments = lesson.coursemessage_set.select_related('user')
+    paginator, comments_page = paginate_comments(comments, 'messageCreated')
+    lesson_messages = comments_page.object_list
+    participants = lesson.participants.all()
 
     context = {
         'lesson': lesson,
         'lesson_messages': lesson_messages,
+        'older_cursor': comments_page.next_cursor,
+        'newer_cursor': paginator.encode_cursor(lesson_messages[0]) if lesson_messages else None,
         'participants': participants,
-        'navbar_template': navbar_template,
-        'back_link': back_link
     }
     return render(request, 'tutoring-zone/lesson.html', context)
 
 
+@login_required(login_url='schoolweb:login')
+def lesson_comments(request, pk):
+    lesson = get_object_or_404(Lesson.objects.select_related('course'), id=pk)
+
+    if not is_lesson_member(request.user, lesson):
+        return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
+
+    comments = lesson.coursemessage_set.select_related('user')
+    return comments_more(request, comments, 'messageCreated', 'tutoring-zone/lesson-comments.html', 'lesson_messages', False)
+
+
 @login_required(login_url='schoolweb:login')
 def createLesson(request):
-    if not request.user.groups.filter(name='Teachers').exists():
+    if 'Teachers' not in request.user_roles:
         return HttpResponseForbidden("Nie masz uprawnień do tej akcji.")
 
     initial_data = {'host': request.user}
@@ -1545,12 +1555,7 @@ def deleteLessonMessage(request, pk):
         lesson_url = request.session.pop('lesson_url', '/')
         return redirect(lesson_url)
 
-    if request.user.groups.filter(name='Teachers').exists():
-        navbar_template = 'tutoring-zone/nav-teacher-view.html'
-    else:
-        navbar_template = 'tutoring-zone/nav-student-view.html'
-
-    context = {'obj': message, 'navbar_template': navbar_template}
+    context = {'obj': message}
     return render(request, 'tutoring-zone/delete-lesson-message.html', context)
 
 
@@ -1604,7 +1609,7 @@ def lessonFeedback(request, pk):
             lesson.feedback_submitted = True
             lesson.save()
 
-            if user.groups.filter(name='Teachers').exists():
+            if 'Teachers' in request.user_roles:
                 lesson_stats = user.lesson_stats
 
                 clicked_count = lesson.clicked_users.count()
@@ -1616,11 +1621,11 @@ def lessonFeedback(request, pk):
                     lesson_stats.all_missed_lessons += 1
                 elif clicked_count == 1:
                     single_user = lesson.clicked_users.first()
-                    if single_user.groups.filter(name='Students').exists():
+                    if 'Students' in single_user.roles:
                         lesson.payment = -50
                         lesson_stats.missed_lessons += 1
                         lesson_stats.all_missed_lessons += 1
-                    elif single_user.groups.filter(name='Teachers').exists():
+                    elif 'Teachers' in single_user.roles:
                         lesson.payment = 20
                         lesson_stats.break_lessons += 1
                         lesson_stats.all_break_lessons += 1
@@ -1688,18 +1693,7 @@ def manage_availability(request):
     if request.method == 'POST':
         form = AvailabilityForm(request.POST)
         if form.is_valid():
-            day = form.cleaned_data['day']
-
-            existing_availability = Availability.objects.filter(user=user, day=day).first()
-
-            if existing_availability:
-                form = AvailabilityForm(request.POST, instance=existing_availability)
-            else:
-                form = AvailabilityForm(request.POST)
-
-            availability = form.save(commit=False)
-            availability.user = user
-            availability.save()
+            Availability.save_days(user, {form.cleaned_data['day']: form.cleaned_data})
 
             return redirect('schoolweb:manage_availability')
     else:
@@ -1711,33 +1705,38 @@ def manage_availability(request):
                   {'form': form, 'user_availability': user_availability})
 
 
-def get_availability(request, selected_date):
-    user = request.user
-    selected_availability = Availability.objects.filter(user=user, day=selected_date).first()
-
-    if selected_availability:
-        availability_data = {
-            'hour_6_7': selected_availability.hour_6_7,
-            'hour_7_8': selected_availability.hour_7_8,
-            'hour_8_9': selected_availability.hour_8_9,
-            'hour_9_10': selected_availability.hour_9_10,
-            'hour_10_11': selected_availability.hour_10_11,
-            'hour_11_12': selected_availability.hour_11_12,
-            'hour_12_13': selected_availability.hour_12_13,
-            'hour_13_14': selected_availability.hour_13_14,
-            'hour_14_15': selected_availability.hour_14_15,
-            'hour_15_16': selected_availability.hour_15_16,
-            'hour_16_17': selected_availability.hour_16_17,
-            'hour_17_18': selected_availability.hour_17_18,
-            'hour_18_19': selected_availability.hour_18_19,
-            'hour_19_20': selected_availability.hour_19_20,
-            'hour_20_21': selected_availability.hour_20_21,
-            'hour_21_22': selected_availability.hour_21_22,
+@login_required
+@require_POST
+def manage_availability_bulk(request):
+    """
+    Save the whole bookable week at once. Body: `{"days": {"2025-03-10": {"hour_17_18": true, ...}, ...}}`, the
+    same shape `get_availability` returns; every listed day is overwritten in one statement. Days must fall in
+    the same window AvailabilityForm offers and every hour must be a JSON boolean.
+    """
+    first_day, last_day = availability_window()
+    try:
+        payload = json.loads(request.body)
+        days = {
+            date.fromisoformat(day): hours for day, hours in payload['days'].items()
+            if isinstance(hours, dict) and set(hours) <= set(Availability.HOUR_FIELDS)
+            and all(isinstance(value, bool) for value in hours.values())
         }
-    else:
-        availability_data = {}
+        valid = len(days) == len(payload['days']) and all(first_day <= day <= last_day for day in days)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        valid = False
+    if not valid or not days:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    with transaction.atomic():
+        Availability.save_days(request.user, days)
+
+    return JsonResponse({'saved': len(days)})
+
+
+def get_availability(request, selected_date):
+    hours = Availability.objects.filter(user=request.user, day=selected_date).values_list('hours', flat=True).first()
 
-    return JsonResponse(availability_data)
+    return JsonResponse(Availability.flags_from_mask(hours) if hours is not None else {})
 
 
 def Lobby(request):